@@ -1,9 +1,10 @@
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 from app.models.patient import PatientInput
 from app.models.api_models import *
+from app.models.responses import Severity
 from app.services.acb_engine import ACBEngine
 from app.services.beers_engine import BeersEngine
 from app.services.stopp_start_engine import STOPPStartEngine
@@ -148,7 +149,9 @@ async def get_taper_plan(request: TaperPlanRequest):
     """
     try:
         result = taper_service.get_taper_plan(request)
-        return result
+        # Already a TaperPlanResponse: encode it directly with pydantic-core instead
+        # of re-validating it against response_model and running json.dumps
+        return Response(content=result.model_dump_json(), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Taper plan error: {str(e)}")
 
@@ -196,8 +199,7 @@ async def check_interactions(request: InteractionCheckRequest):
         )
         
         # Check interactions
-        known = engines['ayurvedic'].check_known_interactions(herbs, meds)
-        simulated = engines['ayurvedic'].simulate_unknown_interactions(herbs, meds, patient)
+        known, simulated = engines['ayurvedic'].check_all_interactions(herbs, meds, patient)
         all_interactions = known + simulated
         
         # Build response
@@ -216,8 +218,8 @@ async def check_interactions(request: InteractionCheckRequest):
             for i in all_interactions
         ]
         
-        major_count = sum(1 for i in all_interactions if i.severity == "Major")
-        moderate_count = sum(1 for i in all_interactions if i.severity == "Moderate")
+        major_count = sum(1 for i in all_interactions if i.severity == Severity.MAJOR)
+        moderate_count = sum(1 for i in all_interactions if i.severity == Severity.MODERATE)
         minor_count = len(all_interactions) - major_count - moderate_count
         
         # Overall assessment
@@ -293,7 +295,10 @@ async def health_check():
 @app.get("/supported-drugs", tags=["Reference"])
 async def get_supported_drugs():
     """Get list of drugs with tapering protocols"""
-    drugs = tapering_data[['drug_name', 'drug_class', 'risk_profile']].to_dict('records')
+    # Names are listed lowercased, as the taper service used to rewrite them in place
+    drugs = (tapering_data[['drug_name', 'drug_class', 'risk_profile']]
+             .assign(drug_name=lambda df: df['drug_name'].str.lower())
+             .to_dict('records'))
     return {
         "total_drugs": len(drugs),
         "drugs": drugs
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import Any, List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from typing import Any, List, Optional, Dict, Tuple
 from enum import Enum
 from app.models.patient import PatientInput, Medication, HerbalProduct
-from app.models.responses import RiskCategory, EvidenceStrength
+from app.models.responses import (
+    RiskCategoryField, EvidenceStrengthField, SeverityField, FlagKind
+)
 
 # ========== Endpoint 1: /analyze-patient ==========
 class AnalyzePatientRequest(BaseModel):
@@ -13,13 +15,15 @@ class MedicationAnalysis(BaseModel):
     """Detailed analysis for a single medication"""
     name: str
     type: str  # "allopathic" or "herbal"
-    risk_category: RiskCategory
+    risk_category: RiskCategoryField
     risk_score: int  # 1-10 scale
     flags: List[str]
     recommendations: List[str]
     taper_required: bool
     taper_duration_weeks: Optional[int] = None
     monitoring_required: List[str]
+    # Internal: kinds of flags raised, not part of the response payload
+    _flag_mask: FlagKind = PrivateAttr(default=FlagKind.NONE)
 
 class TaperingSchedule(BaseModel):
     """Week-by-week tapering schedule"""
@@ -72,25 +76,29 @@ class TaperPlanRequest(BaseModel):
 
 class TaperStep(BaseModel):
     """Single step in taper schedule"""
+    # Frozen: TaperPlanService shares steps between cached and template plans
+    model_config = ConfigDict(frozen=True)
     week: int
     dose: str
     percentage_of_original: int
     instructions: str
     monitoring: str
-    withdrawal_symptoms_to_watch: List[str]
+    withdrawal_symptoms_to_watch: Tuple[str, ...]
 
 class TaperPlanResponse(BaseModel):
     """Detailed taper plan response"""
+    # Frozen: TaperPlanService caches plans and shares them between requests
+    model_config = ConfigDict(frozen=True)
     drug_name: str
     drug_class: str
     risk_profile: str
     taper_strategy: str
     total_duration_weeks: int
-    steps: List[TaperStep]
-    pause_criteria: List[str]
-    reversal_criteria: List[str]
-    monitoring_schedule: Dict[str, List[str]]
-    patient_education: List[str]
+    steps: Tuple[TaperStep, ...]
+    pause_criteria: Tuple[str, ...]
+    reversal_criteria: Tuple[str, ...]
+    monitoring_schedule: Dict[str, Tuple[str, ...]]
+    patient_education: Tuple[str, ...]
 
 # ========== Endpoint 3: /interaction-checker ==========
 class InteractionCheckRequest(BaseModel):
@@ -104,10 +112,10 @@ class InteractionDetail(BaseModel):
     herb_name: str
     drug_name: str
     interaction_type: str
-    severity: str  # "Major", "Moderate", "Minor"
+    severity: SeverityField
     mechanism: str
     clinical_effect: str
-    evidence_strength: EvidenceStrength
+    evidence_strength: EvidenceStrengthField
     recommendation: str
     monitoring_required: List[str]
 
@@ -1,3 +1,5 @@
+import sys
+from functools import cached_property
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from enum import Enum
@@ -27,6 +29,11 @@ class Medication(BaseModel):
     indication: Optional[str] = None
     duration: DurationCategory
 
+    @cached_property
+    def generic_key(self) -> str:
+        """Lowercased, interned generic name for case-insensitive lookups"""
+        return sys.intern(self.generic_name.lower())
+
 class HerbalProduct(BaseModel):
     generic_name: str
     brand_name: Optional[str] = None
@@ -35,6 +42,11 @@ class HerbalProduct(BaseModel):
     intended_effect: Optional[str] = None  # e.g., "sleep", "sugar control"
     duration: DurationCategory
 
+    @cached_property
+    def generic_key(self) -> str:
+        """Lowercased, interned generic name for case-insensitive lookups"""
+        return sys.intern(self.generic_name.lower())
+
 class PatientInput(BaseModel):
     age: int
     gender: Gender
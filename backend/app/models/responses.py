@@ -1,15 +1,67 @@
-from pydantic import BaseModel
-from typing import Any, List, Dict, Optional
-from enum import Enum
+from pydantic import BaseModel, BeforeValidator, ConfigDict, PlainSerializer, WithJsonSchema
+from typing import Annotated, Any, List, Dict, Optional
+from enum import IntEnum, IntFlag
 
-class RiskCategory(str, Enum):
-    RED = "RED"
-    YELLOW = "YELLOW"
-    GREEN = "GREEN"
+class LabelledIntEnum(IntEnum):
+    """IntEnum that compares as an int but prints and serializes as its label"""
+    def __new__(cls, value: int, label: str):
+        member = int.__new__(cls, value)
+        member._value_ = value
+        member.label = label
+        return member
 
-class EvidenceStrength(str, Enum):
-    KNOWN = "known"
-    SIMULATED = "simulated"
+    def __str__(self) -> str:
+        return self.label
+
+    def __format__(self, format_spec: str) -> str:
+        return format(self.label, format_spec)
+
+    @classmethod
+    def _missing_(cls, value):
+        # Accept wire-format labels, e.g. RiskCategory("RED")
+        for member in cls:
+            if member.label == value:
+                return member
+        return None
+
+class RiskCategory(LabelledIntEnum):
+    GREEN = 0, "GREEN"
+    YELLOW = 1, "YELLOW"
+    RED = 2, "RED"
+
+class EvidenceStrength(LabelledIntEnum):
+    KNOWN = 0, "known"
+    SIMULATED = 1, "simulated"
+
+class Severity(LabelledIntEnum):
+    MINOR = 0, "Minor"
+    MINOR_MODERATE = 1, "Minor-Moderate"
+    MODERATE = 2, "Moderate"
+    MAJOR = 3, "Major"
+
+def _label_field(enum_cls):
+    """Model field type that accepts, serializes and documents the label"""
+    return Annotated[
+        enum_cls,
+        BeforeValidator(lambda v: enum_cls(v) if isinstance(v, str) else v),
+        PlainSerializer(lambda member: member.label, return_type=str),
+        WithJsonSchema({"type": "string", "enum": [m.label for m in enum_cls]}),
+    ]
+
+RiskCategoryField = _label_field(RiskCategory)
+EvidenceStrengthField = _label_field(EvidenceStrength)
+SeverityField = _label_field(Severity)
+
+class FlagKind(IntFlag):
+    """Kinds of medication analysis flags, OR-ed into a per-analysis bitmask"""
+    NONE = 0
+    HIGH_ACB = 1
+    STOPP = 2
+    MAJOR_INTERACTION = 4
+    TTB_EXCEEDED = 8
+    BEERS = 16
+    GENDER = 32
+    HERB_INTERACTION = 64
 
 
 class ACBResult(BaseModel):
@@ -17,6 +69,8 @@ class ACBResult(BaseModel):
     medications_with_acb: List[Dict[str, Any]]
 
 class BeersMatch(BaseModel):
+    # Frozen: BeersEngine caches matches and shares them between requests
+    model_config = ConfigDict(frozen=True)
     drug_name: str
     category: str
     rationale: str
@@ -25,6 +79,8 @@ class BeersMatch(BaseModel):
     quality: str
 
 class STOPPFlag(BaseModel):
+    # Frozen: STOPPStartEngine caches flags and shares them between requests
+    model_config = ConfigDict(frozen=True)
     rule_id: str
     drug_medication: str
     condition_disease: str
@@ -32,6 +88,8 @@ class STOPPFlag(BaseModel):
     full_text: str
 
 class TaperPlan(BaseModel):
+    # Frozen: TaperingEngine caches plans and shares them between requests
+    model_config = ConfigDict(frozen=True)
     drug_name: str
     taper_strategy: str
     step_logic: str
@@ -50,6 +108,8 @@ class GenderRiskFlag(BaseModel):
     escalation_applied: bool
 
 class TimeToBenefit(BaseModel):
+    # Frozen: TimeToBenefitEngine caches assessments and shares them between requests
+    model_config = ConfigDict(frozen=True)
     drug_name: str
     indication: str
     time_to_benefit: str
@@ -61,20 +121,22 @@ class TimeToBenefit(BaseModel):
     reference: str
 
 class HerbalInteraction(BaseModel):
+    # Frozen: AyurvedicInteractionEngine caches interactions and shares them between requests
+    model_config = ConfigDict(frozen=True)
     herb_name: str
     drug_name: str
     interaction_type: str
     mechanism: str
-    severity: str
+    severity: SeverityField
     clinical_effect: str
-    evidence_strength: EvidenceStrength
+    evidence_strength: EvidenceStrengthField
     recommendation: str
 
 class MedicationRiskAssessment(BaseModel):
     medication_name: str
     medication_type: str  # "allopathic" or "herbal"
-    base_risk: RiskCategory
-    final_risk: RiskCategory
+    base_risk: RiskCategoryField
+    final_risk: RiskCategoryField
     risk_factors: List[str]
     contributing_modules: List[str]
     justification: str
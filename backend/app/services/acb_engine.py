@@ -1,31 +1,77 @@
+import sys
+import numpy as np
 import pandas as pd
 from app.models.patient import Medication
 from app.models.responses import ACBResult
 
+# Below this many medications the per-med dict lookup beats building a Series
+VECTORIZE_MIN_MEDS = 64
+
 class ACBEngine:
     def __init__(self, acb_df: pd.DataFrame):
         self.acb_df = acb_df
         # Normalize for case-insensitive matching
         self.acb_df['Generic Name'] = self.acb_df['Generic Name'].str.lower()
-    
+
+        # Request-time lookups never touch the DataFrame: deduplicate once (first
+        # row wins, as before) and keep plain Python / NumPy structures only
+        first_rows = self.acb_df.drop_duplicates(subset='Generic Name', keep='first')
+        names = first_rows['Generic Name'].to_numpy(dtype=str)
+        scores = first_rows['ACB Score'].astype(int).to_numpy()
+        brands = first_rows['Brand Name'].to_numpy()
+
+        # Generic name -> (score, brand) for short medication lists
+        self._acb_index = {
+            sys.intern(str(name)): (int(score), brand) for name, score, brand in zip(names, scores, brands)
+        }
+
+        # Sorted name array with parallel scores/brands for the vectorized path
+        order = np.argsort(names, kind='stable')
+        self._names_sorted = names[order]
+        self._scores_sorted = scores[order]
+        self._brands_sorted = brands[order]
+
     def calculate_acb_score(self, medications: list[Medication]) -> ACBResult:
+        if len(medications) >= VECTORIZE_MIN_MEDS:
+            return self._calculate_acb_score_vectorized(medications)
+
         total_score = 0
         meds_with_acb = []
-        
+
         for med in medications:
-            generic_lower = med.generic_name.lower()
-            match = self.acb_df[self.acb_df['Generic Name'] == generic_lower]
-            
-            if not match.empty:
-                score = int(match.iloc[0]['ACB Score'])
+            entry = self._acb_index.get(med.generic_key)
+
+            if entry is not None:
+                score, brand = entry
                 total_score += score
                 meds_with_acb.append({
                     "name": med.generic_name,
-                    "brand": match.iloc[0]['Brand Name'],
+                    "brand": brand,
                     "acb_score": score
                 })
-        
+
         return ACBResult(
             total_acb_score=total_score,
             medications_with_acb=meds_with_acb
         )
+
+    def _calculate_acb_score_vectorized(self, medications: list[Medication]) -> ACBResult:
+        """Score a long medication list with one searchsorted over the sorted names"""
+        query = np.array([m.generic_key for m in medications], dtype=str)
+        idx = np.searchsorted(self._names_sorted, query)
+        idx_clipped = idx.clip(max=len(self._names_sorted) - 1)
+        hit = (idx < len(self._names_sorted)) & (self._names_sorted[idx_clipped] == query)
+
+        matched_meds = [m for m, found in zip(medications, hit) if found]
+        matched_scores = self._scores_sorted[idx[hit]]
+        matched_brands = self._brands_sorted[idx[hit]]
+
+        meds_with_acb = [
+            {"name": med.generic_name, "brand": brand, "acb_score": int(score)}
+            for med, score, brand in zip(matched_meds, matched_scores, matched_brands)
+        ]
+
+        return ACBResult(
+            total_acb_score=int(matched_scores.sum()),
+            medications_with_acb=meds_with_acb
+        )
@@ -1,13 +1,103 @@
-from typing import List, Dict, Tuple
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import List, Dict, Set, Tuple
 from app.models.patient import PatientInput
 from app.models.api_models import (
     MedicationAnalysis, TaperingSchedule, MonitoringPlan, AnalyzePatientResponse
 )
-from app.models.responses import RiskCategory
+from app.models.responses import RiskCategory, Severity, FlagKind
 from app.services.priority_classifier import PriorityClassifier
 from app.services.tapering_engine import TaperingEngine
+import numpy as np
 import pandas as pd
 
+# Flag kinds that on their own make a medication RED
+RED_FLAG_KINDS = (FlagKind.HIGH_ACB | FlagKind.STOPP |
+                  FlagKind.MAJOR_INTERACTION | FlagKind.TTB_EXCEEDED)
+
+def _risk_category_rule(acb_score: int, flag_mask: int, flag_count: int) -> RiskCategory:
+    """Risk category rule, evaluated for every input combination into RISK_LUT"""
+    if acb_score >= 3:
+        return RiskCategory.RED
+    
+    if flag_mask & RED_FLAG_KINDS:
+        return RiskCategory.RED
+    
+    if acb_score >= 1 or flag_count >= 2:
+        return RiskCategory.YELLOW
+    
+    return RiskCategory.GREEN
+
+# The rule saturates at ACB 3 and 2 flags, so clamp inputs to those and
+# precompute RISK_LUT[acb_score][flag_mask][flag_count]
+RISK_LUT_MAX_ACB = 3
+RISK_LUT_MAX_FLAGS = 2
+RISK_LUT = tuple(
+    tuple(
+        tuple(_risk_category_rule(acb, mask, count) for count in range(RISK_LUT_MAX_FLAGS + 1))
+        for mask in range(max(FlagKind) * 2)  # every combination of FlagKind bits
+    )
+    for acb in range(RISK_LUT_MAX_ACB + 1)
+)
+
+# Generic 4-step taper: 25% reduction per step, formatted once at import
+TAPER_STEP_DOSES = tuple(f"{100 - reduction}% of original dose" for reduction in range(25, 101, 25))
+TAPER_STEP_INSTRUCTIONS = "Reduce by 25% from previous dose"
+
+# Fields of a HerbalInteraction reported in the analysis summary, fetched in C
+_interaction_fields = attrgetter(
+    'herb_name', 'drug_name', 'severity', 'clinical_effect', 'evidence_strength'
+)
+
+def _name_key(name: str) -> str:
+    """Lowercased, interned lookup key (matches Medication.generic_key)"""
+    return sys.intern(name.lower())
+
+@dataclass(slots=True)
+class LookupBundle:
+    """Per-analysis module results keyed by lowercased drug name"""
+    acb: Dict[str, int]
+    beers: Dict[str, object]
+    stopp: Set[str]
+    ttb: Dict[str, object]
+    gender: Dict[str, object]
+
+    @classmethod
+    def build(cls, acb_result, beers_matches, stopp_flags, ttb_assessments,
+              gender_flags) -> "LookupBundle":
+        return cls(
+            acb={_name_key(item['name']): item['acb_score'] for item in acb_result.medications_with_acb},
+            beers={_name_key(m.drug_name): m for m in beers_matches},
+            # STOPP flags carry the flagged medication's generic name, so an exact
+            # set lookup replaces the substring scan over every flag
+            stopp={_name_key(f.drug_medication) for f in stopp_flags if f.drug_medication},
+            ttb={_name_key(a.drug_name): a for a in ttb_assessments},
+            gender={_name_key(g.drug_name): g for g in gender_flags},
+        )
+
+@dataclass(slots=True)
+class InteractionsColumnar:
+    """Columnar view of herb-drug interactions for vectorized filtering"""
+    severity: np.ndarray  # int8 Severity codes
+    drug_ids: np.ndarray  # int32 indexes into names
+    herb_ids: np.ndarray  # int32 indexes into names
+    names: List[str]
+
+    @classmethod
+    def build(cls, interactions) -> "InteractionsColumnar":
+        name_ids: Dict[str, int] = {}
+        drug_ids = [name_ids.setdefault(i.drug_name, len(name_ids)) for i in interactions]
+        herb_ids = [name_ids.setdefault(i.herb_name, len(name_ids)) for i in interactions]
+        return cls(
+            severity=np.fromiter((i.severity for i in interactions), dtype=np.int8,
+                                 count=len(interactions)),
+            drug_ids=np.array(drug_ids, dtype=np.int32),
+            herb_ids=np.array(herb_ids, dtype=np.int32),
+            names=list(name_ids),
+        )
+
 class AnalysisService:
     def __init__(self, all_engines: Dict):
         """Initialize with all engine instances"""
@@ -27,18 +117,22 @@ class AnalysisService:
         ttb_assessments = self.engines['ttb'].assess_time_to_benefit(patient)
         
         # Herbal interactions
-        known_interactions = self.engines['ayurvedic'].check_known_interactions(
-            patient.herbs, patient.medications
+        all_interactions = self._check_herbal_interactions(patient)
+        
+        # Build lookup tables once, then medication analyses
+        lookups = LookupBundle.build(
+            acb_result, beers_matches, stopp_flags, ttb_assessments, gender_flags
         )
-        simulated_interactions = self.engines['ayurvedic'].simulate_unknown_interactions(
-            patient.herbs, patient.medications, patient
+        medication_analyses = self._build_medication_analyses(
+            patient, lookups, all_interactions
         )
-        all_interactions = known_interactions + simulated_interactions
         
-        # Build medication analyses
-        medication_analyses = self._build_medication_analyses(
-            patient, acb_result, beers_matches, stopp_flags, 
-            ttb_assessments, gender_flags, all_interactions
+        # Count risk categories once for the summary, recommendations and alerts
+        category_counts = Counter(m.risk_category for m in medication_analyses)
+        
+        # Scan interactions once for the recommendation count and alert lines
+        major_count, major_alert_lines = self._summarize_interactions(
+            all_interactions, InteractionsColumnar.build(all_interactions)
         )
         
         # Build tapering schedules
@@ -51,12 +145,12 @@ class AnalysisService:
         
         # Generate clinical recommendations
         clinical_recommendations = self._generate_clinical_recommendations(
-            medication_analyses, all_interactions, patient
+            medication_analyses, patient, category_counts, major_count
         )
         
         # Generate safety alerts
         safety_alerts = self._generate_safety_alerts(
-            medication_analyses, all_interactions
+            medication_analyses, category_counts, major_alert_lines
         )
         
         # Patient summary
@@ -73,40 +167,37 @@ class AnalysisService:
         
         # Priority summary
         priority_summary = {
-            "RED": sum(1 for m in medication_analyses if m.risk_category == RiskCategory.RED),
-            "YELLOW": sum(1 for m in medication_analyses if m.risk_category == RiskCategory.YELLOW),
-            "GREEN": sum(1 for m in medication_analyses if m.risk_category == RiskCategory.GREEN)
+            "RED": category_counts[RiskCategory.RED],
+            "YELLOW": category_counts[RiskCategory.YELLOW],
+            "GREEN": category_counts[RiskCategory.GREEN]
         }
         
         # Herb-drug interactions summary
         herb_drug_interactions = [
-            {
-                "herb": i.herb_name,
-                "drug": i.drug_name,
-                "severity": i.severity,
-                "effect": i.clinical_effect,
-                "evidence": i.evidence_strength.value
-            }
-            for i in all_interactions
+            {"herb": herb, "drug": drug, "severity": severity.label,
+             "effect": effect, "evidence": evidence.label}
+            for herb, drug, severity, effect, evidence in map(_interaction_fields, all_interactions)
         ]
         
         # Convert START recommendations to response model
         from app.models.api_models import StartRecommendation
         start_recs = [
-            StartRecommendation(
-                criterion_id=rec['criterion_id'],
-                system=rec['system'],
-                criterion=rec['criterion'],
-                drug_class=rec['drug_class'],
-                condition=rec['condition'],
-                indication=rec['indication'],
-                recommendation=rec['recommendation'],
-                evidence=rec['evidence']
+            StartRecommendation.model_construct(
+                criterion_id=rec.criterion_id,
+                system=rec.system,
+                criterion=rec.criterion,
+                drug_class=rec.drug_class,
+                condition=rec.condition,
+                indication=rec.indication,
+                recommendation=rec.recommendation,
+                evidence=rec.evidence
             )
             for rec in start_recommendations
         ]
 
-        return AnalyzePatientResponse(
+        # Everything below was assembled from trusted module output; FastAPI
+        # still validates the response model when serializing it
+        return AnalyzePatientResponse.model_construct(
             patient_summary=patient_summary,
             medication_analyses=medication_analyses,
             priority_summary=priority_summary,
@@ -118,62 +209,69 @@ class AnalysisService:
             safety_alerts=safety_alerts
         )
     
-    def _build_medication_analyses(self, patient, acb_result, beers_matches, 
-                                   stopp_flags, ttb_assessments, gender_flags,
+    def _build_medication_analyses(self, patient, lookups: LookupBundle,
                                    interactions) -> List[MedicationAnalysis]:
         """Build detailed medication analysis"""
         analyses = []
         
-        # Lookup tables
-        acb_lookup = {item['name']: item['acb_score'] for item in acb_result.medications_with_acb}
-        beers_dict = {m.drug_name: m for m in beers_matches}
-        stopp_dict = {f.drug_medication.split()[0]: f for f in stopp_flags if f.drug_medication}
-        ttb_dict = {a.drug_name: a for a in ttb_assessments}
-        gender_dict = {g.drug_name: g for g in gender_flags}
+        # Group interactions by drug and by herb in a single pass
+        interactions_by_drug: Dict[str, List] = {}
+        interactions_by_herb: Dict[str, List] = {}
+        for i in interactions:
+            interactions_by_drug.setdefault(_name_key(i.drug_name), []).append(i)
+            interactions_by_herb.setdefault(_name_key(i.herb_name), []).append(i)
         
         # Analyze each medication
         for med in patient.medications:
+            med_key = med.generic_key
             flags = []
+            flag_mask = FlagKind.NONE
             recommendations = []
             monitoring = []
             
-            acb_score = acb_lookup.get(med.generic_name, 0)
+            acb_score = lookups.acb.get(med_key, 0)
             if acb_score >= 3:
                 flags.append(f"High anticholinergic burden (ACB={acb_score})")
+                flag_mask |= FlagKind.HIGH_ACB
                 recommendations.append("Consider deprescribing to reduce cognitive impairment risk")
                 monitoring.append("Cognitive function")
             elif acb_score > 0:
                 flags.append(f"Moderate anticholinergic burden (ACB={acb_score})")
             
-            if med.generic_name in beers_dict:
-                beers = beers_dict[med.generic_name]
+            beers = lookups.beers.get(med_key)
+            if beers is not None:
                 flags.append(f"Beers Criteria: {beers.category}")
+                flag_mask |= FlagKind.BEERS
                 recommendations.append(beers.recommendation)
             
-            if any(med.generic_name.lower() in k.lower() for k in stopp_dict.keys()):
+            if med_key in lookups.stopp:
                 flags.append("STOPP criteria matched")
+                flag_mask |= FlagKind.STOPP
                 recommendations.append("Review indication and necessity")
             
-            if med.generic_name in ttb_dict:
-                ttb = ttb_dict[med.generic_name]
+            ttb = lookups.ttb.get(med_key)
+            if ttb is not None:
                 if "DEPRESCRIBE" in ttb.recommendation:
                     flags.append("Time-to-benefit exceeds life expectancy")
+                    flag_mask |= FlagKind.TTB_EXCEEDED
                     recommendations.append(ttb.recommendation)
             
-            if med.generic_name in gender_dict:
-                gender = gender_dict[med.generic_name]
+            gender = lookups.gender.get(med_key)
+            if gender is not None:
                 flags.append(f"Gender-specific risk: {gender.risk_category}")
+                flag_mask |= FlagKind.GENDER
                 monitoring.append(gender.monitoring_guidance)
             
             # Check herb interactions
-            med_interactions = [i for i in interactions if i.drug_name.lower() == med.generic_name.lower()]
+            med_interactions = interactions_by_drug.get(med_key, ())
             if med_interactions:
+                flag_mask |= FlagKind.HERB_INTERACTION
                 for interaction in med_interactions:
                     flags.append(f"Herb-drug interaction: {interaction.herb_name} ({interaction.severity})")
                     monitoring.append(f"Monitor for {interaction.clinical_effect}")
             
             # Determine risk category
-            risk_category = self._determine_risk_category(acb_score, flags)
+            risk_category = self._determine_risk_category(acb_score, flag_mask, len(flags))
             risk_score = self._calculate_risk_score(acb_score, len(flags), risk_category)
             
             # Taper requirement
@@ -188,7 +286,9 @@ class AnalysisService:
             if not monitoring:
                 monitoring.append("Routine clinical assessment")
             
-            analyses.append(MedicationAnalysis(
+            # Fields come from already-validated module results, so skip
+            # re-validation; the response model is validated at the API boundary
+            analysis = MedicationAnalysis.model_construct(
                 name=med.generic_name,
                 type="allopathic",
                 risk_category=risk_category,
@@ -198,17 +298,21 @@ class AnalysisService:
                 taper_required=taper_required,
                 taper_duration_weeks=None,  # Will be filled by tapering schedules
                 monitoring_required=monitoring
-            ))
+            )
+            analysis._flag_mask = flag_mask
+            analyses.append(analysis)
         
         # Analyze herbs
         for herb in patient.herbs:
-            herb_interactions = [i for i in interactions if i.herb_name.lower() == herb.generic_name.lower()]
+            herb_interactions = interactions_by_herb.get(herb.generic_key, ())
+            flag_mask = FlagKind.NONE
             
             if herb_interactions:
-                major = [i for i in herb_interactions if i.severity == "Major"]
+                major = [i for i in herb_interactions if i.severity == Severity.MAJOR]
                 if major:
                     risk_category = RiskCategory.RED
                     flags = [f"Major interaction with {i.drug_name}" for i in major]
+                    flag_mask = FlagKind.MAJOR_INTERACTION
                 else:
                     risk_category = RiskCategory.YELLOW
                     flags = [f"Moderate interaction with {i.drug_name}" for i in herb_interactions]
@@ -216,7 +320,7 @@ class AnalysisService:
                 risk_category = RiskCategory.GREEN
                 flags = ["No interactions identified"]
             
-            analyses.append(MedicationAnalysis(
+            analysis = MedicationAnalysis.model_construct(
                 name=herb.generic_name,
                 type="herbal",
                 risk_category=risk_category,
@@ -224,8 +328,11 @@ class AnalysisService:
                 flags=flags,
                 recommendations=["Monitor for interactions"] if herb_interactions else ["Continue as indicated"],
                 taper_required=False,
+                taper_duration_weeks=None,
                 monitoring_required=["Watch for adverse effects"]
-            ))
+            )
+            analysis._flag_mask = flag_mask
+            analyses.append(analysis)
         
         return analyses
     
@@ -241,14 +348,16 @@ class AnalysisService:
                 plan.monitoring_frequency
             )
             
-            for week, step in enumerate(steps, start=1):
-                schedules.append(TaperingSchedule(
+            schedules.extend(
+                TaperingSchedule.model_construct(
                     medication_name=plan.drug_name,
                     week=week,
                     dose=step['dose'],
                     instructions=step['instructions'],
                     monitoring=step['monitoring']
-                ))
+                )
+                for week, step in enumerate(steps, start=1)
+            )
         
         return schedules
     
@@ -256,13 +365,18 @@ class AnalysisService:
         """Build comprehensive monitoring plans"""
         plans = []
         
+        # Index taper plans by drug once (first plan wins, as the linear scan did)
+        taper_by_name = {}
+        for t in taper_plans:
+            taper_by_name.setdefault(_name_key(t.drug_name), t)
+        
         for analysis in medication_analyses:
             if analysis.taper_required:
                 # Find taper plan
-                taper = next((t for t in taper_plans if t.drug_name == analysis.name), None)
+                taper = taper_by_name.get(_name_key(analysis.name))
                 
                 if taper:
-                    plans.append(MonitoringPlan(
+                    plans.append(MonitoringPlan.model_construct(
                         medication_name=analysis.name,
                         frequency=taper.monitoring_frequency,
                         parameters=analysis.monitoring_required,
@@ -273,7 +387,7 @@ class AnalysisService:
                         ]
                     ))
             elif analysis.risk_category in [RiskCategory.YELLOW, RiskCategory.RED]:
-                plans.append(MonitoringPlan(
+                plans.append(MonitoringPlan.model_construct(
                     medication_name=analysis.name,
                     frequency="Monthly",
                     parameters=analysis.monitoring_required,
@@ -283,12 +397,32 @@ class AnalysisService:
         
         return plans
     
-    def _generate_clinical_recommendations(self, analyses, interactions, patient) -> List[str]:
+    def _check_herbal_interactions(self, patient: PatientInput) -> List:
+        """Known interactions, then simulated ones for the pairs they don't cover"""
+        known, simulated = self.engines['ayurvedic'].check_all_interactions(
+            patient.herbs, patient.medications, patient
+        )
+        return known + simulated
+    
+    def _summarize_interactions(self, interactions,
+                                columnar: InteractionsColumnar) -> Tuple[int, List[str]]:
+        """Count major interactions and format their alert lines"""
+        major_idx = np.flatnonzero(columnar.severity == Severity.MAJOR)
+        names = columnar.names
+        alert_lines = [
+            f"🚨 MAJOR INTERACTION: {names[herb_id]} + {names[drug_id]} - {interactions[k].clinical_effect}"
+            for k, herb_id, drug_id in zip(major_idx, columnar.herb_ids[major_idx],
+                                           columnar.drug_ids[major_idx])
+        ]
+        return len(major_idx), alert_lines
+    
+    def _generate_clinical_recommendations(self, analyses, patient, category_counts,
+                                           major_count: int) -> List[str]:
         """Generate top-level clinical recommendations"""
         recommendations = []
         
-        red_count = sum(1 for a in analyses if a.risk_category == RiskCategory.RED)
-        yellow_count = sum(1 for a in analyses if a.risk_category == RiskCategory.YELLOW)
+        red_count = category_counts[RiskCategory.RED]
+        yellow_count = category_counts[RiskCategory.YELLOW]
         
         if red_count > 0:
             recommendations.append(f"URGENT: {red_count} medication(s) flagged as HIGH PRIORITY for deprescribing review")
@@ -299,68 +433,51 @@ class AnalysisService:
         if patient.cfs_score and patient.cfs_score >= 6:
             recommendations.append("Patient is severely frail (CFS ≥6): Use extreme caution with any medication changes")
         
-        major_interactions = [i for i in interactions if i.severity == "Major"]
-        if major_interactions:
-            recommendations.append(f"ALERT: {len(major_interactions)} major herb-drug interaction(s) identified - immediate review required")
+        if major_count:
+            recommendations.append(f"ALERT: {major_count} major herb-drug interaction(s) identified - immediate review required")
         
         if patient.age >= 80:
             recommendations.append("Patient is 80+ years old: Enhanced pharmacovigilance recommended")
         
         return recommendations
     
-    def _generate_safety_alerts(self, analyses, interactions) -> List[str]:
+    def _generate_safety_alerts(self, analyses, category_counts,
+                                major_alert_lines: List[str]) -> List[str]:
         """Generate safety alerts"""
         alerts = []
         
         # High ACB medications
-        high_acb = [a for a in analyses if "High anticholinergic" in ' '.join(a.flags)]
+        high_acb = [a for a in analyses if a._flag_mask & FlagKind.HIGH_ACB]
         if high_acb:
             alerts.append(f"⚠️ {len(high_acb)} medication(s) with high anticholinergic burden - FALL RISK")
         
         # Major interactions
-        major_herb = [i for i in interactions if i.severity == "Major"]
-        if major_herb:
-            for interaction in major_herb:
-                alerts.append(f"🚨 MAJOR INTERACTION: {interaction.herb_name} + {interaction.drug_name} - {interaction.clinical_effect}")
+        alerts.extend(major_alert_lines)
         
         # Multiple RED flags
-        red_meds = [a for a in analyses if a.risk_category == RiskCategory.RED]
-        if len(red_meds) >= 3:
-            alerts.append(f"⚠️ POLYPHARMACY RISK: {len(red_meds)} high-risk medications - comprehensive medication review recommended")
+        red_count = category_counts[RiskCategory.RED]
+        if red_count >= 3:
+            alerts.append(f"⚠️ POLYPHARMACY RISK: {red_count} high-risk medications - comprehensive medication review recommended")
         
         return alerts
     
     def _parse_taper_steps(self, step_logic: str, duration_weeks: int, monitoring: str) -> List[Dict]:
         """Parse step logic into weekly schedule"""
         # Simplified parser - you can expand this
-        steps = []
-        weeks_per_step = max(1, duration_weeks // 4)
-        
-        # Example: Create 4 steps
-        for i in range(4):
-            week = i * weeks_per_step + 1
-            reduction = 25 * (i + 1)
-            steps.append({
-                'dose': f"{100 - reduction}% of original dose",
-                'instructions': f"Reduce by {25}% from previous dose",
+        # Doses and instructions are the same for every plan; only monitoring varies
+        return [
+            {
+                'dose': dose,
+                'instructions': TAPER_STEP_INSTRUCTIONS,
                 'monitoring': monitoring if i % 2 == 0 else "Continue monitoring"
-            })
-        
-        return steps
+            }
+            for i, dose in enumerate(TAPER_STEP_DOSES)
+        ]
     
-    def _determine_risk_category(self, acb_score: int, flags: List[str]) -> RiskCategory:
-        """Determine risk category based on scores and flags"""
-        if acb_score >= 3:
-            return RiskCategory.RED
-        
-        red_keywords = ["High anticholinergic", "STOPP", "Major interaction", "Time-to-benefit"]
-        if any(any(keyword in flag for keyword in red_keywords) for flag in flags):
-            return RiskCategory.RED
-        
-        if acb_score >= 1 or len(flags) >= 2:
-            return RiskCategory.YELLOW
-        
-        return RiskCategory.GREEN
+    def _determine_risk_category(self, acb_score: int, flag_mask: FlagKind,
+                                 flag_count: int) -> RiskCategory:
+        """Determine risk category based on scores and flag kinds"""
+        return RISK_LUT[min(acb_score, RISK_LUT_MAX_ACB)][flag_mask][min(flag_count, RISK_LUT_MAX_FLAGS)]
     
     def _calculate_risk_score(self, acb_score: int, flag_count: int, category: RiskCategory) -> int:
         """Calculate numerical risk score (1-10)"""
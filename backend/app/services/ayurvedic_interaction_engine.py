@@ -1,8 +1,162 @@
+import re
+import sys
 import pandas as pd
 import json
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional
 from app.models.patient import PatientInput, HerbalProduct, Medication
-from app.models.responses import HerbalInteraction, EvidenceStrength, RiskCategory
+from app.models.responses import HerbalInteraction, EvidenceStrength, RiskCategory, Severity
+
+# Intended-effect keywords per inferred category. The lookahead reports a
+# match at every position, so overlapping keywords ("rest" in "stress") are
+# still found, as with plain substring checks.
+_INFER_RE = re.compile(
+    r'(?=(?:(?P<sedative>sleep|insomnia|rest)'
+    r'|(?P<glucose>sugar|diabetes|glucose)'
+    r'|(?P<blood_pressure>blood pressure|hypertension|bp)'
+    r'|(?P<immune>immunity|immune)'
+    r'|(?P<inflammation>pain|inflammation|arthritis)'
+    r'|(?P<anxiety>anxiety|stress|calm)))'
+)
+
+# (category, pharmacological profile entries, safety concern), in rule order
+_INFERENCE_RULES = (
+    ('sedative', {'sedative_like': 0.6}, 'sedation'),
+    ('glucose', {'hypoglycemic': 0.7}, 'hypoglycemia'),
+    ('blood_pressure', {'hypotensive': 0.6}, 'hypotension'),
+    ('immune', {'immunomodulator': 0.6}, 'immunomodulation'),
+    ('inflammation', {'anti_inflammatory': 0.6, 'antiplatelet': 0.4}, 'bleeding risk'),
+    ('anxiety', {'anxiolytic_like': 0.6, 'sedative_like': 0.4}, None),
+)
+
+@lru_cache(maxsize=1024)
+def _infer_herb_profile_cached(generic_name: str, intended_effect: str) -> Dict:
+    """Infer pharmacological profile from intended effect (memoized by strings)"""
+    intended = intended_effect.lower()
+    
+    # Default profile
+    profile = {
+        'herb_name': generic_name,
+        'pharmacological_profile': {},
+        'safety_concerns': []
+    }
+    
+    # Inference rules: one C-level scan finds every category hit, then
+    # rules apply in their fixed order
+    hits = {m.lastgroup for m in _INFER_RE.finditer(intended)}
+    for category, effects, concern in _INFERENCE_RULES:
+        if category in hits:
+            profile['pharmacological_profile'].update(effects)
+            if concern:
+                profile['safety_concerns'].append(concern)
+    
+    return profile
+
+# Drug families checked by _simulate_interaction and their name tokens
+_DRUG_FAMILY_TERMS = (
+    ('sedative', ('benzodiazepine', 'zolpidem', 'zopiclone', 'alprazolam', 'diazepam', 'lorazepam')),
+    ('hypoglycemic', ('insulin', 'metformin', 'glyburide', 'glipizide', 'sulfonylurea')),
+    ('hypotensive', ('amlodipine', 'lisinopril', 'losartan', 'metoprolol', 'atenolol')),
+    ('antiplatelet', ('warfarin', 'aspirin', 'clopidogrel', 'rivaroxaban', 'apixaban')),
+    ('immunosuppressant', ('cyclosporine', 'tacrolimus', 'prednisone', 'azathioprine')),
+)
+# All families in one automaton-style pass; the lookahead reports every
+# position so one medication name can hit several families
+_DRUG_FAMILY_RE = re.compile(
+    '(?=(?:' + '|'.join(f"(?P<{family}>{'|'.join(terms)})" for family, terms in _DRUG_FAMILY_TERMS) + '))'
+)
+
+@lru_cache(maxsize=4096)
+def _drug_families(med_lower: str) -> frozenset:
+    """Drug families whose tokens occur in a lowercased medication name"""
+    return frozenset(m.lastgroup for m in _DRUG_FAMILY_RE.finditer(med_lower))
+
+# Fixed text of each simulated interaction, shared by every instance built
+_SIMULATED_TYPE = sys.intern("Pharmacodynamic (simulated)")
+_SEDATIVE_TEMPLATE = dict(
+    interaction_type=_SIMULATED_TYPE,
+    mechanism="Both have sedative properties; additive CNS depression possible",
+    severity=Severity.MODERATE,
+    clinical_effect="Increased sedation, drowsiness, fall risk",
+    evidence_strength=EvidenceStrength.SIMULATED,
+    recommendation="Monitor for excessive sedation. Consider reducing doses or timing separation."
+)
+_HYPOGLYCEMIC_TEMPLATE = dict(
+    interaction_type=_SIMULATED_TYPE,
+    mechanism="Both may lower blood glucose; additive hypoglycemic effect",
+    severity=Severity.MODERATE,
+    clinical_effect="Increased risk of hypoglycemia",
+    evidence_strength=EvidenceStrength.SIMULATED,
+    recommendation="Monitor blood glucose closely. May need to adjust diabetes medication dose."
+)
+_HYPOTENSIVE_TEMPLATE = dict(
+    interaction_type=_SIMULATED_TYPE,
+    mechanism="Both may lower blood pressure; additive hypotensive effect",
+    severity=Severity.MODERATE,
+    clinical_effect="Risk of hypotension, dizziness, falls",
+    evidence_strength=EvidenceStrength.SIMULATED,
+    recommendation="Monitor blood pressure. Consider dose adjustment if symptomatic hypotension occurs."
+)
+_ANTIPLATELET_TEMPLATE = dict(
+    interaction_type=_SIMULATED_TYPE,
+    mechanism="Both may affect blood clotting; increased bleeding risk",
+    severity=Severity.MAJOR,
+    clinical_effect="Increased bleeding risk",
+    evidence_strength=EvidenceStrength.SIMULATED,
+    recommendation="Avoid combination or monitor INR/bleeding parameters closely. Inform patient of bleeding signs."
+)
+_IMMUNOSUPPRESSANT_TEMPLATE = dict(
+    interaction_type=_SIMULATED_TYPE,
+    mechanism="Immune stimulation may counteract immunosuppression",
+    severity=Severity.MODERATE,
+    clinical_effect="Reduced immunosuppressive effect; risk of transplant rejection",
+    evidence_strength=EvidenceStrength.SIMULATED,
+    recommendation="Avoid combination in transplant patients. Consult specialist before use."
+)
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _KnownInteractionTable:
+    """
+    Known interaction rows keyed by interned lowercase herb name, read-only
+    after engine init. Hashed by identity.
+    """
+    herb_index: Dict[str, List[Dict]]
+
+def _known_interaction(herb_name: str, drug_name: str, row: Dict) -> HerbalInteraction:
+    """Build a documented interaction from a known-interaction row
+    
+    Rows are normalized at engine init, so validation is skipped here; API
+    responses are still validated at the endpoint boundary.
+    """
+    return HerbalInteraction.model_construct(
+        herb_name=herb_name,
+        drug_name=drug_name,
+        interaction_type=row['interaction_type'],
+        mechanism=row['mechanism'],
+        severity=row['_severity'],
+        clinical_effect=row['clinical_effect'],
+        evidence_strength=EvidenceStrength.KNOWN,
+        recommendation=row['_recommendation']
+    )
+
+@lru_cache(maxsize=512)
+def _known_interactions_for(table: _KnownInteractionTable, herb_names: Tuple[str, ...],
+                            med_names: Tuple[str, ...]) -> Tuple[HerbalInteraction, ...]:
+    """Known interactions for the given names (cached; interactions are frozen and shared)"""
+    interactions = []
+    med_keys = [(med_name, sys.intern(med_name.lower())) for med_name in med_names]
+    
+    for herb_name in herb_names:
+        herb_rows = table.herb_index.get(sys.intern(herb_name.lower()), ())
+        
+        for med_name, drug_lower in med_keys:
+            # Direct drug name match
+            for row in herb_rows:
+                if drug_lower in row['specific_drugs']:
+                    interactions.append(_known_interaction(herb_name, med_name, row))
+    
+    return tuple(interactions)
 
 class AyurvedicInteractionEngine:
     def __init__(self, known_interactions_df: pd.DataFrame, 
@@ -12,65 +166,97 @@ class AyurvedicInteractionEngine:
         self.pharmacological_profiles = pharmacological_profiles
         self.herbs_summary_df = herbs_summary_df
         
-        # Normalize for case-insensitive matching
-        self.known_interactions_df['herb_name'] = self.known_interactions_df['herb_name'].str.lower()
+        # Normalize for case-insensitive matching; interned so equality against
+        # interned request keys short-circuits on identity
+        self.known_interactions_df['herb_name'] = (
+            self.known_interactions_df['herb_name'].str.lower().map(sys.intern, na_action='ignore')
+        )
         self.known_interactions_df['specific_drugs'] = self.known_interactions_df['specific_drugs'].str.lower()
         self.herbs_summary_df['Herb Name'] = self.herbs_summary_df['Herb Name'].str.lower()
         
+        # Index known interaction rows by herb so lookups avoid DataFrame scans
+        self._herb_index: Dict[str, List[Dict]] = {}
+        for row in self.known_interactions_df.to_dict('records'):
+            if isinstance(row['herb_name'], str):
+                row['specific_drugs'] = row['specific_drugs'] if isinstance(row['specific_drugs'], str) else ""
+                # Severity parsing and recommendation text depend only on the row
+                row['_severity'] = Severity(row['severity'])
+                row['_recommendation'] = self._generate_recommendation(row['severity'], row['clinical_effect'])
+                self._herb_index.setdefault(row['herb_name'], []).append(row)
+        self._known_table = _KnownInteractionTable(self._herb_index)
+        
         # Build herb profile lookup
         self.herb_profiles = {}
         for herb in self.pharmacological_profiles.get('herbs', []):
-            self.herb_profiles[herb['herb_name'].lower()] = herb
+            self.herb_profiles[sys.intern(herb['herb_name'].lower())] = herb
     
     def check_known_interactions(self, herbs: List[HerbalProduct], 
                                  medications: List[Medication]) -> List[HerbalInteraction]:
         """Check evidence-based herb-drug interactions"""
-        interactions = []
+        # Results depend only on the names, so repeat queries hit the cache
+        return list(_known_interactions_for(
+            self._known_table,
+            tuple(h.generic_name for h in herbs),
+            tuple(m.generic_name for m in medications)
+        ))
+    
+    def check_all_interactions(self, herbs: List[HerbalProduct],
+                               medications: List[Medication],
+                               patient: PatientInput) -> Tuple[List[HerbalInteraction], List[HerbalInteraction]]:
+        """Known and simulated interactions in one pass over herbs x medications
+        
+        Pairs with a documented interaction are not simulated. Returns
+        (known, simulated), each in the order check_known_interactions and
+        simulate_unknown_interactions produce.
+        """
+        known, simulated = [], []
+        known_interaction = _known_interaction
+        simulate_interaction = self._simulate_interaction
+        # Unpack model attributes once rather than per grid cell
+        med_data = [(med, med.generic_name, med.generic_key) for med in medications]
         
         for herb in herbs:
-            herb_lower = herb.generic_name.lower()
+            herb_name, herb_key = herb.generic_name, herb.generic_key
+            herb_rows = self._herb_index.get(herb_key, ())
+            herb_profile = None
             
-            for med in medications:
-                drug_lower = med.generic_name.lower()
-                
-                # Direct drug name match
-                matches = self.known_interactions_df[
-                    (self.known_interactions_df['herb_name'] == herb_lower) &
-                    (self.known_interactions_df['specific_drugs'].str.contains(drug_lower, na=False, case=False))
+            for med, med_name, drug_lower in med_data:
+                pair_known = [
+                    known_interaction(herb_name, med_name, row)
+                    for row in herb_rows if drug_lower in row['specific_drugs']
                 ]
+                if pair_known:
+                    known.extend(pair_known)
+                    continue
+                
+                if herb_profile is None:
+                    # Infer from intended effect if no profile exists
+                    herb_profile = self.herb_profiles.get(herb_key) or self._infer_herb_profile(herb)
                 
-                if not matches.empty:
-                    for _, row in matches.iterrows():
-                        interactions.append(HerbalInteraction(
-                            herb_name=herb.generic_name,
-                            drug_name=med.generic_name,
-                            interaction_type=row['interaction_type'],
-                            mechanism=row['mechanism'],
-                            severity=row['severity'],
-                            clinical_effect=row['clinical_effect'],
-                            evidence_strength=EvidenceStrength.KNOWN,
-                            recommendation=self._generate_recommendation(row['severity'], row['clinical_effect'])
-                        ))
-        
-        return interactions
+                interaction = simulate_interaction(herb, med, herb_profile, patient)
+                if interaction:
+                    simulated.append(interaction)
+        
+        return known, simulated
     
     def simulate_unknown_interactions(self, herbs: List[HerbalProduct], 
                                      medications: List[Medication],
                                      patient: PatientInput) -> List[HerbalInteraction]:
         """Simulate interactions for herbs without documented evidence"""
         simulated_interactions = []
+        med_data = [(med, med.generic_name, med.generic_key) for med in medications]
         
         for herb in herbs:
-            herb_lower = herb.generic_name.lower()
+            herb_name, herb_lower = herb.generic_name, herb.generic_key
             herb_profile = self.herb_profiles.get(herb_lower)
             
             if not herb_profile:
                 # Infer from intended effect if no profile exists
                 herb_profile = self._infer_herb_profile(herb)
             
-            for med in medications:
+            for med, med_name, med_lower in med_data:
                 # Check if already covered by known interactions
-                if self._has_known_interaction(herb.generic_name, med.generic_name):
+                if self._has_known_interaction(herb_name, med_name):
                     continue
                 
                 # Simulate based on pharmacological overlap
@@ -82,132 +268,70 @@ class AyurvedicInteractionEngine:
     
     def _has_known_interaction(self, herb_name: str, drug_name: str) -> bool:
         """Check if known interaction already exists"""
-        herb_lower = herb_name.lower()
+        herb_lower = sys.intern(herb_name.lower())
         drug_lower = drug_name.lower()
         
-        matches = self.known_interactions_df[
-            (self.known_interactions_df['herb_name'] == herb_lower) &
-            (self.known_interactions_df['specific_drugs'].str.contains(drug_lower, na=False, case=False))
-        ]
-        return not matches.empty
+        return any(drug_lower in row['specific_drugs']
+                   for row in self._herb_index.get(herb_lower, ()))
     
     def _infer_herb_profile(self, herb: HerbalProduct) -> Dict:
-        """Infer pharmacological profile from intended effect"""
-        intended = (herb.intended_effect or "").lower()
-        
-        # Default profile
-        profile = {
-            'herb_name': herb.generic_name,
-            'pharmacological_profile': {},
-            'safety_concerns': []
-        }
-        
-        # Inference rules
-        if any(word in intended for word in ['sleep', 'insomnia', 'rest']):
-            profile['pharmacological_profile']['sedative_like'] = 0.6
-            profile['safety_concerns'].append('sedation')
-        
-        if any(word in intended for word in ['sugar', 'diabetes', 'glucose']):
-            profile['pharmacological_profile']['hypoglycemic'] = 0.7
-            profile['safety_concerns'].append('hypoglycemia')
-        
-        if any(word in intended for word in ['blood pressure', 'hypertension', 'bp']):
-            profile['pharmacological_profile']['hypotensive'] = 0.6
-            profile['safety_concerns'].append('hypotension')
-        
-        if any(word in intended for word in ['immunity', 'immune']):
-            profile['pharmacological_profile']['immunomodulator'] = 0.6
-            profile['safety_concerns'].append('immunomodulation')
-        
-        if any(word in intended for word in ['pain', 'inflammation', 'arthritis']):
-            profile['pharmacological_profile']['anti_inflammatory'] = 0.6
-            profile['pharmacological_profile']['antiplatelet'] = 0.4
-            profile['safety_concerns'].append('bleeding risk')
-        
-        if any(word in intended for word in ['anxiety', 'stress', 'calm']):
-            profile['pharmacological_profile']['anxiolytic_like'] = 0.6
-            profile['pharmacological_profile']['sedative_like'] = 0.4
-        
-        return profile
+        """Infer pharmacological profile from intended effect
+        
+        The returned profile is cached and shared between calls; treat it as read-only.
+        """
+        return _infer_herb_profile_cached(herb.generic_name, herb.intended_effect or "")
     
     def _simulate_interaction(self, herb: HerbalProduct, med: Medication, 
                              herb_profile: Dict, patient: PatientInput) -> Optional[HerbalInteraction]:
         """Simulate potential interaction based on pharmacological profiles"""
-        pharm_profile = herb_profile.get('pharmacological_profile', {})
-        med_lower = med.generic_name.lower()
+        pharm_profile: Dict[str, float] = herb_profile.get('pharmacological_profile', {})
+        families = _drug_families(med.generic_key)
+        
+        # Read each score once into a typed local
+        sedative_like = float(pharm_profile.get('sedative_like', 0.0))
+        hypoglycemic = float(pharm_profile.get('hypoglycemic', 0.0))
+        hypotensive = float(pharm_profile.get('hypotensive', 0.0))
+        antiplatelet = float(pharm_profile.get('antiplatelet', 0.0))
+        immunomodulator = float(pharm_profile.get('immunomodulator', 0.0))
         
         # Sedative interactions
-        if pharm_profile.get('sedative_like', 0) >= 0.5:
-            if any(term in med_lower for term in ['benzodiazepine', 'zolpidem', 'zopiclone', 'alprazolam', 'diazepam', 'lorazepam']):
-                return HerbalInteraction(
-                    herb_name=herb.generic_name,
-                    drug_name=med.generic_name,
-                    interaction_type="Pharmacodynamic (simulated)",
-                    mechanism="Both have sedative properties; additive CNS depression possible",
-                    severity="Moderate",
-                    clinical_effect="Increased sedation, drowsiness, fall risk",
-                    evidence_strength=EvidenceStrength.SIMULATED,
-                    recommendation="Monitor for excessive sedation. Consider reducing doses or timing separation."
-                )
+        if sedative_like >= 0.5 and 'sedative' in families:
+            return self._make_simulated(herb, med, **_SEDATIVE_TEMPLATE)
         
         # Hypoglycemic interactions
-        if pharm_profile.get('hypoglycemic', 0) >= 0.5:
-            if any(term in med_lower for term in ['insulin', 'metformin', 'glyburide', 'glipizide', 'sulfonylurea']):
-                return HerbalInteraction(
-                    herb_name=herb.generic_name,
-                    drug_name=med.generic_name,
-                    interaction_type="Pharmacodynamic (simulated)",
-                    mechanism="Both may lower blood glucose; additive hypoglycemic effect",
-                    severity="Moderate",
-                    clinical_effect="Increased risk of hypoglycemia",
-                    evidence_strength=EvidenceStrength.SIMULATED,
-                    recommendation="Monitor blood glucose closely. May need to adjust diabetes medication dose."
-                )
+        if hypoglycemic >= 0.5 and 'hypoglycemic' in families:
+            return self._make_simulated(herb, med, **_HYPOGLYCEMIC_TEMPLATE)
         
         # Hypotensive interactions
-        if pharm_profile.get('hypotensive', 0) >= 0.5:
-            if any(term in med_lower for term in ['amlodipine', 'lisinopril', 'losartan', 'metoprolol', 'atenolol']):
-                return HerbalInteraction(
-                    herb_name=herb.generic_name,
-                    drug_name=med.generic_name,
-                    interaction_type="Pharmacodynamic (simulated)",
-                    mechanism="Both may lower blood pressure; additive hypotensive effect",
-                    severity="Moderate",
-                    clinical_effect="Risk of hypotension, dizziness, falls",
-                    evidence_strength=EvidenceStrength.SIMULATED,
-                    recommendation="Monitor blood pressure. Consider dose adjustment if symptomatic hypotension occurs."
-                )
+        if hypotensive >= 0.5 and 'hypotensive' in families:
+            return self._make_simulated(herb, med, **_HYPOTENSIVE_TEMPLATE)
         
         # Antiplatelet/bleeding interactions
-        if pharm_profile.get('antiplatelet', 0) >= 0.4:
-            if any(term in med_lower for term in ['warfarin', 'aspirin', 'clopidogrel', 'rivaroxaban', 'apixaban']):
-                return HerbalInteraction(
-                    herb_name=herb.generic_name,
-                    drug_name=med.generic_name,
-                    interaction_type="Pharmacodynamic (simulated)",
-                    mechanism="Both may affect blood clotting; increased bleeding risk",
-                    severity="Major",
-                    clinical_effect="Increased bleeding risk",
-                    evidence_strength=EvidenceStrength.SIMULATED,
-                    recommendation="Avoid combination or monitor INR/bleeding parameters closely. Inform patient of bleeding signs."
-                )
+        if antiplatelet >= 0.4 and 'antiplatelet' in families:
+            return self._make_simulated(herb, med, **_ANTIPLATELET_TEMPLATE)
         
         # Immunomodulator interactions
-        if pharm_profile.get('immunomodulator', 0) >= 0.6:
-            if any(term in med_lower for term in ['cyclosporine', 'tacrolimus', 'prednisone', 'azathioprine']):
-                return HerbalInteraction(
-                    herb_name=herb.generic_name,
-                    drug_name=med.generic_name,
-                    interaction_type="Pharmacodynamic (simulated)",
-                    mechanism="Immune stimulation may counteract immunosuppression",
-                    severity="Moderate",
-                    clinical_effect="Reduced immunosuppressive effect; risk of transplant rejection",
-                    evidence_strength=EvidenceStrength.SIMULATED,
-                    recommendation="Avoid combination in transplant patients. Consult specialist before use."
-                )
+        if immunomodulator >= 0.6 and 'immunosuppressant' in families:
+            return self._make_simulated(herb, med, **_IMMUNOSUPPRESSANT_TEMPLATE)
         
         return None
     
+    def _make_simulated(self, herb: HerbalProduct, med: Medication, interaction_type: str,
+                        mechanism: str, severity: Severity, clinical_effect: str,
+                        evidence_strength: EvidenceStrength,
+                        recommendation: str) -> HerbalInteraction:
+        """Build a simulated pharmacodynamic interaction from a template (trusted, unvalidated)"""
+        return HerbalInteraction.model_construct(
+            herb_name=herb.generic_name,
+            drug_name=med.generic_name,
+            interaction_type=interaction_type,
+            mechanism=mechanism,
+            severity=severity,
+            clinical_effect=clinical_effect,
+            evidence_strength=evidence_strength,
+            recommendation=recommendation
+        )
+    
     def _generate_recommendation(self, severity: str, clinical_effect: str) -> str:
         """Generate recommendation based on interaction severity"""
         severity_lower = severity.lower()
@@ -223,16 +347,23 @@ class AyurvedicInteractionEngine:
                                    herb_interactions: List[HerbalInteraction]) -> Tuple[RiskCategory, List[str]]:
         """Apply risk escalation based on herb-drug interactions"""
         reasons = []
-        modified_risk = base_risk
+        max_severity = Severity.MINOR
         
         for interaction in herb_interactions:
-            if interaction.severity == "Major":
+            severity = interaction.severity
+            if severity > max_severity:
+                max_severity = severity
+            if severity == Severity.MAJOR:
                 if base_risk != RiskCategory.RED:
-                    modified_risk = RiskCategory.RED
-                    reasons.append(f"Major herb-drug interaction: {interaction.herb_name} + {interaction.drug_name} ({interaction.evidence_strength.value})")
-            elif interaction.severity == "Moderate":
+                    reasons.append(f"Major herb-drug interaction: {interaction.herb_name} + {interaction.drug_name} ({interaction.evidence_strength.label})")
+            elif severity == Severity.MODERATE:
                 if base_risk == RiskCategory.GREEN:
-                    modified_risk = RiskCategory.YELLOW
-                    reasons.append(f"Moderate herb-drug interaction: {interaction.herb_name} + {interaction.drug_name} ({interaction.evidence_strength.value})")
+                    reasons.append(f"Moderate herb-drug interaction: {interaction.herb_name} + {interaction.drug_name} ({interaction.evidence_strength.label})")
         
-        return modified_risk, reasons
+        # Only the highest severity decides the category, so a Major is never
+        # downgraded by a later Moderate
+        if max_severity == Severity.MAJOR and base_risk != RiskCategory.RED:
+            return RiskCategory.RED, reasons
+        if max_severity >= Severity.MODERATE and base_risk == RiskCategory.GREEN:
+            return RiskCategory.YELLOW, reasons
+        return base_risk, reasons
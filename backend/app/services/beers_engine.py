@@ -1,33 +1,66 @@
+from dataclasses import dataclass
+from functools import lru_cache
 import pandas as pd
 from app.models.patient import PatientInput
 from app.models.responses import BeersMatch
 
+_MATCH_COLUMNS = ('category_or_disease', 'rationale', 'recommendation', 'strength', 'quality')
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _BeersTable:
+    """
+    Beers rows as (drug_name, applies_at_any_age, all_text, row), so matching
+    is a plain substring test instead of a per-medication column scan.
+    Hashed by identity.
+    """
+    rows: tuple
+
+
+@lru_cache(maxsize=1024)
+def _beers_matches(table: _BeersTable, generic_name: str, is_older_adult: bool) -> tuple[BeersMatch, ...]:
+    """Beers matches for one medication (cached; matches are frozen and shared)"""
+    drug_lower = generic_name.lower()
+    matches = []
+    
+    # Match drug in Beers list
+    for beers_name, any_age, all_text, row in table.rows:
+        if drug_lower not in beers_name:
+            continue
+        # Age check (if Table 2 PIM, applies to age >= 65)
+        if is_older_adult or any_age:
+            # Rows with all text fields need no validation; others are
+            # still validated so missing values are rejected as before
+            build = BeersMatch.model_construct if all_text else BeersMatch
+            matches.append(build(
+                drug_name=generic_name,
+                category=row['category_or_disease'],
+                rationale=row['rationale'],
+                recommendation=row['recommendation'],
+                strength=row['strength'],
+                quality=row['quality']
+            ))
+    
+    return tuple(matches)
+
+
 class BeersEngine:
     def __init__(self, beers_df: pd.DataFrame):
         self.beers_df = beers_df
         self.beers_df['drug_name'] = self.beers_df['drug_name'].str.lower()
+        
+        self._table = _BeersTable(tuple(
+            (row['drug_name'], row['category_or_disease'] != 'N/A',
+             all(isinstance(row[col], str) for col in _MATCH_COLUMNS), row)
+            for row in self.beers_df.to_dict('records')
+            if isinstance(row['drug_name'], str)
+        ))
     
     def check_beers_criteria(self, patient: PatientInput) -> list[BeersMatch]:
+        is_older_adult = patient.age >= 65
         matches = []
         
         for med in patient.medications:
-            drug_lower = med.generic_name.lower()
-            
-            # Match drug in Beers list
-            drug_matches = self.beers_df[
-                self.beers_df['drug_name'].str.contains(drug_lower, na=False)
-            ]
-            
-            for _, row in drug_matches.iterrows():
-                # Age check (if Table 2 PIM, applies to age >= 65)
-                if patient.age >= 65 or row['category_or_disease'] != 'N/A':
-                    matches.append(BeersMatch(
-                        drug_name=med.generic_name,
-                        category=row['category_or_disease'],
-                        rationale=row['rationale'],
-                        recommendation=row['recommendation'],
-                        strength=row['strength'],
-                        quality=row['quality']
-                    ))
+            matches.extend(_beers_matches(self._table, med.generic_name, is_older_adult))
         
         return matches
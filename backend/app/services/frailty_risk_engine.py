@@ -1,18 +1,27 @@
+import re
 import pandas as pd
 from app.models.patient import PatientInput
 from app.models.responses import RiskCategory
 from typing import List
 
+# Drug classes escalated for severely frail patients (CFS >= 6)
+HIGH_RISK_CLASSES = frozenset([
+    'benzodiazepine', 'sedative', 'hypnotic', 'anticholinergic',
+    'antipsychotic', 'z-drug', 'opioid', 'tricyclic'
+])
+_HIGH_RISK_RE = re.compile('|'.join(re.escape(c) for c in sorted(HIGH_RISK_CLASSES)), re.IGNORECASE)
+
 class FrailtyRiskEngine:
     def __init__(self, cfs_map_df: pd.DataFrame):
         self.cfs_map_df = cfs_map_df
+        # CFS score -> row dict (first row wins, as the filter did)
+        self._cfs_map = {}
+        for row in cfs_map_df.to_dict('records'):
+            self._cfs_map.setdefault(int(row['cfs_score']), row)
     
     def get_frailty_data(self, cfs_score: int) -> dict:
         """Get frailty parameters for a given CFS score"""
-        row = self.cfs_map_df[self.cfs_map_df['cfs_score'] == cfs_score]
-        if row.empty:
-            return None
-        return row.iloc[0].to_dict()
+        return self._cfs_map.get(cfs_score)
     
     def should_escalate_risk(self, patient: PatientInput, drug_class: str) -> tuple[bool, str]:
         """
@@ -22,17 +31,10 @@ class FrailtyRiskEngine:
         cfs_score = patient.cfs_score if patient.cfs_score else (5 if patient.is_frail else 2)
         
         # CFS >= 6 triggers escalation for high-risk drug classes
-        if cfs_score >= 6:
-            high_risk_classes = [
-                'benzodiazepine', 'sedative', 'hypnotic', 'anticholinergic',
-                'antipsychotic', 'z-drug', 'opioid', 'tricyclic'
-            ]
-            
-            for risk_class in high_risk_classes:
-                if risk_class in drug_class.lower():
-                    frailty_data = self.get_frailty_data(cfs_score)
-                    reason = f"CFS {cfs_score} ({frailty_data['clinical_label']}): {frailty_data['clinical_guidance']}"
-                    return True, reason
+        if cfs_score >= 6 and _HIGH_RISK_RE.search(drug_class):
+            frailty_data = self.get_frailty_data(cfs_score)
+            reason = f"CFS {cfs_score} ({frailty_data['clinical_label']}): {frailty_data['clinical_guidance']}"
+            return True, reason
         
         return False, ""
     
@@ -2,13 +2,270 @@ import os
 import json
 import re
 import math
-from typing import Dict, List, Optional, Any
+import copy
+import time
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
 from urllib import response
 
+import numpy as np
 import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions, retry as api_retry
 from dotenv import load_dotenv
 load_dotenv()
 
+# Surrounding markdown code fence, optionally tagged json
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", flags=re.S | re.I)
+
+
+# Pure text helpers behind GeminiTaperService._strip_code_fence and
+# _extract_json_substring, memoized so re-parsing the same reply is free
+@lru_cache(maxsize=256)
+def _strip_code_fence_cached(text: str) -> str:
+    t = text.strip()
+    if not t.startswith("```"):
+        return t
+    # Simple fenced-block removal (handles ```json and ``` cases)
+    m = _FENCE_RE.match(t)
+    if m:
+        return m.group(1).strip()
+    return t
+
+
+@lru_cache(maxsize=256)
+def _extract_json_substring_cached(text: str) -> str:
+    s = text.strip()
+
+    # Fast check: if the whole string is valid JSON, return it
+    try:
+        json.loads(s)
+        return s
+    except Exception:
+        pass
+
+    return GeminiTaperService._scan_json(text)[0]
+
+
+# Static prompt prefixes. Everything request-specific is appended after them by
+# _build_prompt, so repeat calls share an identical leading block that the
+# model's implicit prefix cache can reuse.
+_TAPER_PROMPT_PREFIX = """
+You are a clinical pharmacist specializing in deprescribing. Generate a week-by-week tapering schedule for the patient and medication described under PATIENT at the end.
+
+Return ONLY valid JSON with this exact structure:
+{"taper_steps": [{"week": 1, "dose": "20mg", "percentage_of_original": 100, "instructions": "...", "monitoring": "...", "withdrawal_symptoms_to_watch": ["..."]}], "patient_education": ["..."], "pause_criteria": ["..."], "success_indicators": ["..."]}
+
+Requirements:
+1. "week" is a single integer, never a range; the first step is week 1 and steps are 1-2+ weeks apart
+2. Use the number of steps given under Step Count
+3. Doses are specific with units (mg, tablets, etc.); the final step is complete discontinuation at the Total Tapering Duration week
+4. If the tapering protocol mentions substitution, include substitution steps
+5. Slow the reductions for higher frailty, and be extra cautious with benzodiazepines, SSRIs and opioids
+6. Monitoring is specific to the drug class; patient instructions use simple, non-medical language
+"""
+
+_MONITORING_PROMPT_PREFIX = """
+You are a clinical pharmacist. Create a practical monitoring plan in JSON only for the medication and patient described under PATIENT at the end.
+
+Return JSON like:
+{
+  "monitoring_schedule": {
+    "Week 1-2": ["parameter1", "parameter2"],
+    "Week 3-4": ["parameter1", "parameter2"],
+    "Monthly": ["parameter1", "parameter2"]
+  },
+  "alert_criteria": ["string"],
+  "patient_diary_items": ["string"]
+}
+
+Use realistic monitoring parameters and clear alarm thresholds. Return ONLY JSON.
+"""
+
+_RECOMMENDATIONS_PROMPT_PREFIX = """
+You are a clinical pharmacist reviewing the medication regimen of the patient described under PATIENT at the end.
+
+Generate 5–7 prioritized clinical recommendations for clinicians.
+
+Requirements:
+1. Start with urgent/high-risk items first.
+2. Be specific and actionable.
+3. Adjust for frailty and life expectancy.
+4. Address polypharmacy.
+5. Mention serious herb–drug interactions.
+6. Include monitoring items.
+7. Ensure recommendations fit goals of care.
+
+Return ONLY valid JSON array of strings:
+
+[
+  "Recommendation 1",
+  "Recommendation 2"
+]
+"""
+
+_DRUG_INFO_PROMPT_PREFIX = """
+You are a clinical pharmacologist. A medication has been flagged in clinical guidelines; its clinical context and the patient are described under PATIENT at the end.
+
+Based on this clinical context, provide tapering guidance:
+
+{
+"drug_class": "Primary drug class",
+"risk_profile": "High-risk or Standard",
+"taper_strategy_name": "Appropriate tapering approach",
+"step_logic": "Detailed tapering instructions",
+"withdrawal_symptoms": "symptom1, symptom2, symptom3",
+"monitoring_frequency": "Recommended frequency",
+"pause_criteria": "When to pause",
+"requires_taper": true or false,
+"typical_duration_weeks": 4-24,
+"special_considerations": "Notes for elderly/frail patients"
+}
+
+Since this drug is in Beers/STOPP, be EXTRA cautious about:
+1. Withdrawal risks in elderly patients
+2. Need for gradual tapering vs. abrupt discontinuation
+3. Monitoring requirements
+
+Return ONLY valid JSON.
+"""
+
+# Exact-match cache of parsed model replies, keyed by prompt hash
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+RESPONSE_CACHE_MAX_ENTRIES = 512
+
+# Per-call timeout, and backoff retries for transient API errors (429/5xx)
+GEMINI_TIMEOUT_SECONDS = 30
+_GEMINI_RETRY = api_retry.Retry(
+    predicate=api_retry.if_exception_type(
+        api_exceptions.TooManyRequests,
+        api_exceptions.InternalServerError,
+        api_exceptions.ServiceUnavailable,
+    ),
+    initial=0.5,
+    maximum=8.0,
+    multiplier=2.0,
+    timeout=60.0,
+)
+
+
+# Drug-name aliases -> class info for _get_fallback_drug_info_with_intelligence,
+# checked in order
+_FALLBACK_DRUG_PATTERNS = {
+    # Dementia drugs - NO taper needed
+    ('donepezil', 'aricept', 'memantine', 'namenda', 'rivastigmine', 'exelon', 'galantamine'): {
+        'drug_class': 'Dementia medication',
+        'risk_profile': 'Standard',
+        'requires_taper': False,
+        'typical_duration_weeks': 0,
+        'step_logic': 'Can be discontinued without tapering in most cases',
+        'withdrawal_symptoms': 'Possible cognitive decline, return of dementia symptoms',
+        'special_considerations': 'Discontinuation should be monitored but tapering not required'
+    },
+
+    # Benzodiazepines - REQUIRE taper
+    ('alprazolam', 'xanax', 'lorazepam', 'ativan', 'diazepam', 'valium', 'clonazepam', 'klonopin'): {
+        'drug_class': 'Benzodiazepine',
+        'risk_profile': 'High-risk',
+        'requires_taper': True,
+        'typical_duration_weeks': 12,
+        'step_logic': 'Ashton protocol - very gradual 10% reduction every 2 weeks',
+        'withdrawal_symptoms': 'Anxiety, insomnia, tremors, seizures, confusion'
+    },
+
+    # SSRIs - REQUIRE taper
+    ('sertraline', 'zoloft', 'fluoxetine', 'prozac', 'paroxetine', 'paxil', 'citalopram', 'celexa', 'escitalopram', 'lexapro'): {
+        'drug_class': 'SSRI Antidepressant',
+        'risk_profile': 'High-risk',
+        'requires_taper': True,
+        'typical_duration_weeks': 8,
+        'step_logic': 'Hyperbolic taper - reduce by 25% every 2-4 weeks',
+        'withdrawal_symptoms': 'Brain zaps, dizziness, nausea, irritability, flu-like symptoms'
+    },
+
+    # Statins - NO taper needed
+    ('atorvastatin', 'lipitor', 'simvastatin', 'zocor', 'rosuvastatin', 'crestor', 'pravastatin'): {
+        'drug_class': 'Statin',
+        'risk_profile': 'Low-risk',
+        'requires_taper': False,
+        'typical_duration_weeks': 0,
+        'step_logic': 'Can be stopped abruptly',
+        'withdrawal_symptoms': 'None typically'
+    },
+
+    # ACE Inhibitors - Minimal taper
+    ('lisinopril', 'enalapril', 'ramipril', 'perindopril', 'benazepril'): {
+        'drug_class': 'ACE Inhibitor',
+        'risk_profile': 'Standard',
+        'requires_taper': False,
+        'typical_duration_weeks': 1,
+        'step_logic': 'Monitor blood pressure for rebound hypertension',
+        'withdrawal_symptoms': 'Possible rebound hypertension'
+    },
+
+    # PPIs - Minimal taper
+    ('omeprazole', 'prilosec', 'pantoprazole', 'protonix', 'esomeprazole', 'nexium', 'lansoprazole'): {
+        'drug_class': 'Proton Pump Inhibitor',
+        'risk_profile': 'Standard',
+        'requires_taper': True,
+        'typical_duration_weeks': 4,
+        'step_logic': 'Reduce dose by 50% for 2 weeks, then switch to H2 blocker if needed',
+        'withdrawal_symptoms': 'Rebound acid hypersecretion'
+    }
+}
+
+# Full fallback record per table entry, keyed by regex group name
+_FALLBACK_DRUG_RECORDS = {
+    f"c{index}": {
+        'drug_class': info['drug_class'],
+        'risk_profile': info.get('risk_profile', 'Standard'),
+        'taper_strategy_name': 'Evidence-based protocol',
+        'step_logic': info['step_logic'],
+        'withdrawal_symptoms': info.get('withdrawal_symptoms', 'General discomfort'),
+        'monitoring_frequency': 'Weekly',
+        'pause_criteria': 'Severe symptoms or patient distress',
+        'requires_taper': info['requires_taper'],
+        'typical_duration_weeks': info['typical_duration_weeks'],
+        'special_considerations': info.get('special_considerations', 'Monitor elderly patients closely')
+    }
+    for index, info in enumerate(_FALLBACK_DRUG_PATTERNS.values())
+}
+
+# One lookahead per table entry, tried in table order, so the first entry
+# with any alias anywhere in the name wins; lastgroup names that entry
+_FALLBACK_DRUG_RE = re.compile(
+    "(?:" + "|".join(
+        f"(?=.*?(?P<c{index}>{'|'.join(map(re.escape, drug_names))}))"
+        for index, drug_names in enumerate(_FALLBACK_DRUG_PATTERNS)
+    ) + ")",
+    re.S
+)
+
+_GENERIC_FALLBACK_DRUG_INFO = {
+    "drug_class": "Unknown",
+    "risk_profile": "Standard",
+    "taper_strategy_name": "Gradual Reduction",
+    "step_logic": "Reduce by 25% every 2 weeks with monitoring",
+    "withdrawal_symptoms": "Possible return of symptoms, general discomfort",
+    "monitoring_frequency": "Weekly",
+    "pause_criteria": "Severe symptoms or patient distress",
+    "requires_taper": True,
+    "typical_duration_weeks": 4,
+    "special_considerations": "Consult healthcare provider for personalized guidance"
+}
+
+
+@lru_cache(maxsize=512)
+def _fallback_drug_info(drug_lower: str) -> Dict:
+    """Shared fallback record for the first table entry with an alias in drug_lower"""
+    m = _FALLBACK_DRUG_RE.match(drug_lower)
+    return _FALLBACK_DRUG_RECORDS[m.lastgroup] if m else _GENERIC_FALLBACK_DRUG_INFO
+
+
+def _build_prompt(prefix: str, dynamic_block: str) -> str:
+    """Static prefix first, request-specific details last"""
+    return prefix + "\n\n<PATIENT>\n" + dynamic_block.strip() + "\n</PATIENT>\n"
+
 
 class GeminiTaperService:
     def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.5-pro"):
@@ -19,6 +276,13 @@ class GeminiTaperService:
         genai.configure(api_key=self.api_key)
         # If your SDK differs you may need to change this line
         self.model = genai.GenerativeModel(model_name)
+        # Shared by every call on the one long-lived model client
+        self._request_options = {"timeout": GEMINI_TIMEOUT_SECONDS, "retry": _GEMINI_RETRY}
+        # prompt digest -> (expires_at, parsed reply)
+        self._response_cache: Dict[bytes, Tuple[float, Any]] = {}
+        # Recommendations keyed on a normalized patient fingerprint, so
+        # patients with the same prompt inputs share one model call
+        self._recommendation_cache: Dict[tuple, Tuple[float, List[str]]] = {}
 
     # ------------------------------
     # Helpers
@@ -34,13 +298,7 @@ class GeminiTaperService:
         """
         if not isinstance(text, str):
             return str(text)
-
-        t = text.strip()
-        # Simple fenced-block removal (handles ```json and ``` cases)
-        m = re.match(r"^```(?:json)?\s*(.*?)\s*```$", t, flags=re.S | re.I)
-        if m:
-            return m.group(1).strip()
-        return t
+        return _strip_code_fence_cached(text)
 
     @staticmethod
     def _extract_json_substring(text: str) -> str:
@@ -50,36 +308,63 @@ class GeminiTaperService:
         """
         if not isinstance(text, str):
             text = str(text)
+        return _extract_json_substring_cached(text)
 
-        s = text.strip()
-
-        # Fast check: if the whole string is valid JSON, return it
-        try:
-            json.loads(s)
-            return s
-        except Exception:
-            pass
-
-        # Find first '{' or '[' and attempt to match braces
-        starts = [m.start() for m in re.finditer(r"[\{\[]", text)]
-        for start in starts:
-            open_char = text[start]
-            close_char = "}" if open_char == "{" else "]"
-            depth = 0
-            for i in range(start, len(text)):
-                if text[i] == open_char:
-                    depth += 1
-                elif text[i] == close_char:
-                    depth -= 1
-                    if depth == 0:
-                        candidate = text[start : i + 1]
-                        try:
-                            json.loads(candidate)
-                            return candidate
-                        except Exception:
-                            break  # invalid candidate; try next start
+    @staticmethod
+    def _scan_json(text: str) -> Tuple[str, Any]:
+        """
+        Find the first valid JSON object/array inside text.
+        Returns (substring, parsed value) so callers need not decode it again;
+        raises ValueError if none found.
+        """
+        # Try each '{' / '[' in order; a string-aware bracket scan finds the
+        # balanced region it opens and only that region is handed to json
+        pos = 0
+        while True:
+            starts = [i for i in (text.find("{", pos), text.find("[", pos)) if i != -1]
+            if not starts:
+                break
+            start = min(starts)
+            end = GeminiTaperService._balanced_end(text, start)
+            if end is not None:
+                candidate = text[start:end]
+                try:
+                    return candidate, json.loads(candidate)
+                except Exception:
+                    pass  # invalid candidate; try next start
+            pos = start + 1
         raise ValueError("No valid JSON object/array found in model output.")
 
+    @staticmethod
+    def _balanced_end(text: str, start: int) -> Optional[int]:
+        """
+        Index just past the bracket closing the one at text[start], skipping
+        brackets inside JSON strings. None if unbalanced or mismatched.
+        """
+        closers = {"{": "}", "[": "]"}
+        stack = []
+        in_string = False
+        escape = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in closers:
+                stack.append(closers[ch])
+            elif ch == "}" or ch == "]":
+                if ch != stack.pop():
+                    return None
+                if not stack:
+                    return i + 1
+        return None
+
     def _get_text_from_response(self, raw_response: Any) -> str:
         """
         Extract textual content from the model response object. Supports:
@@ -141,13 +426,35 @@ class GeminiTaperService:
         except json.JSONDecodeError:
             pass
 
-        # 2) try to find a JSON substring inside the cleaned text
+        # 2) try to find a JSON substring inside the cleaned text; the whole
+        #    text already failed above, so go straight to the scan and keep
+        #    the value it decoded
         try:
-            candidate = self._extract_json_substring(cleaned)
-            return json.loads(candidate)
+            return self._scan_json(cleaned)[1]
         except Exception as e:
             raise ValueError(f"Failed to parse JSON from model output: {e}\nRaw response excerpt: {cleaned[:500]}")
 
+    def _generate_json(self, prompt: str) -> Any:
+        """
+        Send prompt to the model and return the reply parsed as JSON.
+        Only successfully parsed replies are cached, so failures are retried
+        on the next call; callers get their own copy and may mutate it.
+        """
+        key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+        now = time.monotonic()
+        cached = self._response_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return copy.deepcopy(cached[1])
+
+        raw = self.model.generate_content(prompt, request_options=self._request_options)
+        parsed = self._parse_model_response_to_json(raw)
+
+        if len(self._response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            # Drop the oldest entry (dicts keep insertion order)
+            self._response_cache.pop(next(iter(self._response_cache)), None)
+        self._response_cache[key] = (now + RESPONSE_CACHE_TTL_SECONDS, parsed)
+        return copy.deepcopy(parsed)
+
     # ------------------------------
     # Public methods
     # ------------------------------
@@ -169,9 +476,7 @@ class GeminiTaperService:
         Use Gemini to generate detailed, personalized taper schedule.
         On failure, return conservative fallback schedule.
         """
-        prompt = f"""
-You are a clinical pharmacist specializing in deprescribing. Generate a detailed, week-by-week tapering schedule.
-
+        prompt = _build_prompt(_TAPER_PROMPT_PREFIX, f"""
 **Patient Information:**
 - Age: {patient_age} years
 - Clinical Frailty Scale: {cfs_score}/9
@@ -189,74 +494,12 @@ You are a clinical pharmacist specializing in deprescribing. Generate a detailed
 
 **Total Tapering Duration:** {total_weeks} weeks (adjusted for frailty)
 
-**Known Withdrawal Symptoms:** {withdrawal_symptoms}
+**Step Count:** {max(4, total_weeks // 3)} to {min(8, total_weeks // 2)} steps
 
-**CRITICAL INSTRUCTIONS:**
-Generate a JSON response with this EXACT structure. Each step must have a SINGLE INTEGER for the week field:
-
-{{
-  "taper_steps": [
-    {{
-      "week": 1,
-      "dose": "specific dose with units",
-      "percentage_of_original": 100,
-      "instructions": "Clear patient instructions",
-      "monitoring": "What to monitor this week",
-      "withdrawal_symptoms_to_watch": ["symptom1", "symptom2"]
-    }},
-    {{
-      "week": 3,
-      "dose": "specific dose with units",
-      "percentage_of_original": 75,
-      "instructions": "Clear patient instructions",
-      "monitoring": "What to monitor this week",
-      "withdrawal_symptoms_to_watch": ["symptom1", "symptom2"]
-    }}
-  ],
-  "patient_education": [
-    "Education point 1",
-    "Education point 2",
-    "Education point 3"
-  ],
-  "pause_criteria": [
-    "When to pause tapering - criteria 1",
-    "When to pause tapering - criteria 2"
-  ],
-  "success_indicators": [
-    "Signs tapering is going well",
-    "What successful completion looks like"
-  ]
-}}
-
-**STRICT REQUIREMENTS:**
-1. "week" field must be a SINGLE INTEGER (e.g., 1, 3, 5) NOT a range (e.g., "1-2")
-2. Create {max(4, total_weeks // 3)} to {min(8, total_weeks // 2)} steps with appropriate week intervals
-3. First step should always be week 1
-4. Each subsequent step should be at least 1-2 weeks apart
-5. Each dose reduction should be specific with units (mg, tablets, etc.)
-6. If step_logic mentions substitution, include substitution steps
-7. Adjust reduction speed for frailty level {cfs_score}
-8. Include specific monitoring parameters relevant to {drug_class}
-9. Patient instructions must be in simple, non-medical language
-10. Final step should be complete discontinuation (week {total_weeks})
-11. Be extra cautious with high-risk classes (benzodiazepines, SSRIs, opioids)
-
-**EXAMPLE of CORRECT format:**
-{{
-  "taper_steps": [
-    {{"week": 1, "dose": "20mg", "percentage_of_original": 100, ...}},
-    {{"week": 3, "dose": "15mg", "percentage_of_original": 75, ...}},
-    {{"week": 5, "dose": "10mg", "percentage_of_original": 50, ...}},
-    {{"week": 8, "dose": "STOP", "percentage_of_original": 0, ...}}
-  ]
-}}
-
-Return ONLY valid JSON, no additional text. Do not use week ranges.
-"""
+**Known Withdrawal Symptoms:** {withdrawal_symptoms}
+""")
         try:
-            raw = self.model.generate_content(prompt)
-            parsed = self._parse_model_response_to_json(raw)
-            return parsed
+            return self._generate_json(prompt)
         except Exception as e:
             print(f"[GeminiTaperService] failed to generate taper schedule: {e}")
             return self._generate_fallback_schedule(total_weeks, current_dose, patient_age, cfs_score)
@@ -270,20 +513,22 @@ Return ONLY valid JSON, no additional text. Do not use week ranges.
         num_steps = max(2, num_steps)
         reduction_per_step = 100 / num_steps
 
-        steps = []
-        for i in range(num_steps):
-            percentage = round(max(0, 100 - reduction_per_step * i), 1)
-            week = 1 + int(i * (total_weeks / num_steps))
-            steps.append(
-                {
-                    "week": week,
-                    "dose": f"{percentage}% of {current_dose}",
-                    "percentage_of_original": percentage,
-                    "instructions": f"Reduce dose to {percentage}% of the original. Take exactly as directed.",
-                    "monitoring": "Watch for withdrawal symptoms and return of original condition",
-                    "withdrawal_symptoms_to_watch": ["anxiety", "insomnia", "agitation"],
-                }
-            )
+        # Percentages and weeks for every step at once
+        step_index = np.arange(num_steps)
+        percentages = np.round(np.maximum(0, 100 - reduction_per_step * step_index), 1)
+        weeks = 1 + (step_index * (total_weeks / num_steps)).astype(int)
+
+        steps = [
+            {
+                "week": week,
+                "dose": f"{percentage}% of {current_dose}",
+                "percentage_of_original": percentage,
+                "instructions": f"Reduce dose to {percentage}% of the original. Take exactly as directed.",
+                "monitoring": "Watch for withdrawal symptoms and return of original condition",
+                "withdrawal_symptoms_to_watch": ["anxiety", "insomnia", "agitation"],
+            }
+            for week, percentage in zip(weeks.tolist(), percentages.tolist())
+        ]
 
         # ensure final step indicates discontinuation
         if steps and steps[-1]["percentage_of_original"] > 0:
@@ -323,32 +568,15 @@ Return ONLY valid JSON, no additional text. Do not use week ranges.
         Generate a monitoring plan for the given medication.
         Returns a dict with monitoring_schedule, alert_criteria and patient_diary_items.
         """
-        prompt = f"""
-You are a clinical pharmacist. Create a practical monitoring plan in JSON only.
-
+        prompt = _build_prompt(_MONITORING_PROMPT_PREFIX, f"""
 Medication: {medication_name}
 Risk category: {risk_category}
 Risk factors: {', '.join(risk_factors) if risk_factors else 'None'}
 Patient age: {patient_age}
 Comorbidities: {', '.join(comorbidities) if comorbidities else 'None'}
-
-Return JSON like:
-{{
-  "monitoring_schedule": {{
-    "Week 1-2": ["parameter1", "parameter2"],
-    "Week 3-4": ["parameter1", "parameter2"],
-    "Monthly": ["parameter1", "parameter2"]
-  }},
-  "alert_criteria": ["string"],
-  "patient_diary_items": ["string"]
-}}
-
-Use realistic monitoring parameters and clear alarm thresholds. Return ONLY JSON.
-"""
+""")
         try:
-            raw = self.model.generate_content(prompt)
-            parsed = self._parse_model_response_to_json(raw)
-            return parsed
+            return self._generate_json(prompt)
         except Exception as e:
             print(f"[GeminiTaperService] monitoring plan generation failed: {e}")
             return {
@@ -369,9 +597,15 @@ Use realistic monitoring parameters and clear alarm thresholds. Return ONLY JSON
     ) -> List[str]:
         """Generate personalized clinical recommendations using Gemini"""
 
-        prompt = f"""
-You are a clinical pharmacist reviewing a patient's medication regimen.
+        fingerprint = self._patient_fingerprint(
+            patient_summary, red_medications, yellow_medications, interactions
+        )
+        now = time.monotonic()
+        cached = self._recommendation_cache.get(fingerprint)
+        if cached is not None and cached[0] > now:
+            return list(cached[1])
 
+        prompt = _build_prompt(_RECOMMENDATIONS_PROMPT_PREFIX, f"""
 **Patient Summary:**
 - Age: {patient_summary.get('age')}
 - Frailty: {patient_summary.get('frailty_status')}
@@ -383,39 +617,30 @@ You are a clinical pharmacist reviewing a patient's medication regimen.
 **Review-Needed Medications (YELLOW):** {', '.join(yellow_medications) if yellow_medications else 'None'}
 
 **Herb-Drug Interactions:** {len(interactions)} identified
-
-Generate 5–7 prioritized clinical recommendations for clinicians.
-
-Requirements:
-1. Start with urgent/high-risk items first.
-2. Be specific and actionable.
-3. Adjust for frailty and life expectancy.
-4. Address polypharmacy.
-5. Mention serious herb–drug interactions.
-6. Include monitoring items.
-7. Ensure recommendations fit goals of care.
-
-Return ONLY valid JSON array of strings:
-
-[
-  "Recommendation 1",
-  "Recommendation 2"
-]
-"""
+""")
         try:
-            raw = self.model.generate_content(prompt)
+            raw = self.model.generate_content(prompt, request_options=self._request_options)
             parsed = self._parse_model_response_to_json(raw)
 
+            recommendations = None
             if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
-                return parsed
+                recommendations = parsed
 
             # If model returned dict with key 'recommendations' or similar, try extracting it
-            if isinstance(parsed, dict):
+            elif isinstance(parsed, dict):
                 for key in ("recommendations", "clinical_recommendations", "results"):
                     if key in parsed and isinstance(parsed[key], list):
-                        return [str(x) for x in parsed[key]]
+                        recommendations = [str(x) for x in parsed[key]]
+                        break
 
-            raise ValueError("Model did not return a JSON array of strings.")
+            if recommendations is None:
+                raise ValueError("Model did not return a JSON array of strings.")
+
+            # Only model answers are cached; fallbacks below are retried next time
+            if len(self._recommendation_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+                self._recommendation_cache.pop(next(iter(self._recommendation_cache)), None)
+            self._recommendation_cache[fingerprint] = (now + RESPONSE_CACHE_TTL_SECONDS, recommendations)
+            return list(recommendations)
         except Exception as e:
             print(f"[GeminiTaperService] Clinical recommendation generation failed: {e}")
             return [
@@ -427,6 +652,34 @@ Return ONLY valid JSON array of strings:
                 "Simplify regimen to reduce polypharmacy burden."
             ]
         
+    @staticmethod
+    def _patient_fingerprint(
+        patient_summary: Dict,
+        red_medications: List[str],
+        yellow_medications: List[str],
+        interactions: List[Dict],
+    ) -> tuple:
+        """
+        Normalized key for recommendation reuse: age, frailty and prognosis
+        as given, case/order-insensitive sets of comorbidities and RED/YELLOW
+        medications, and the sorted (herb, drug, severity) interactions.
+        """
+        return (
+            patient_summary.get('age'),
+            patient_summary.get('frailty_status'),
+            patient_summary.get('cfs_score'),
+            str(patient_summary.get('life_expectancy')),
+            frozenset(str(c).strip().lower() for c in patient_summary.get('comorbidities') or ()),
+            frozenset(m.strip().lower() for m in red_medications),
+            frozenset(m.strip().lower() for m in yellow_medications),
+            tuple(sorted(
+                (str(i.get('herb_name', '')).strip().lower(),
+                 str(i.get('drug_name', '')).strip().lower(),
+                 str(i.get('severity', '')))
+                for i in interactions
+            )),
+        )
+
     def get_drug_information_with_context(
         self, 
         drug_name: str, 
@@ -438,50 +691,15 @@ Return ONLY valid JSON array of strings:
         Extract drug information with clinical context from Beers/STOPP
         """
         
-        prompt = f"""
-    You are a clinical pharmacologist. A medication has been flagged in clinical guidelines.
-
-    {clinical_context}
-
-    Patient: {patient_age} years old
-    Comorbidities: {', '.join(comorbidities) if comorbidities else 'None'}
-
-    Based on this clinical context, provide tapering guidance:
-
-    {{
-    "drug_class": "Primary drug class",
-    "risk_profile": "High-risk or Standard",
-    "taper_strategy_name": "Appropriate tapering approach",
-    "step_logic": "Detailed tapering instructions",
-    "withdrawal_symptoms": "symptom1, symptom2, symptom3",
-    "monitoring_frequency": "Recommended frequency",
-    "pause_criteria": "When to pause",
-    "requires_taper": true or false,
-    "typical_duration_weeks": 4-24,
-    "special_considerations": "Notes for elderly/frail patients"
-    }}
-
-    Since this drug is in Beers/STOPP, be EXTRA cautious about:
-    1. Withdrawal risks in elderly patients
-    2. Need for gradual tapering vs. abrupt discontinuation
-    3. Monitoring requirements
+        prompt = _build_prompt(_DRUG_INFO_PROMPT_PREFIX, f"""
+{clinical_context}
 
-    Return ONLY valid JSON.
-    """
+Patient: {patient_age} years old
+Comorbidities: {', '.join(comorbidities) if comorbidities else 'None'}
+""")
 
         try:
-            raw = self.model.generate_content(prompt)
-
-            # Clean output (handles ```json, ``` fences and raw text)
-            cleaned = self._strip_code_fence(raw.text)
-
-            # Try direct JSON load
-            try:
-                drug_info = json.loads(cleaned)
-            except json.JSONDecodeError:
-                # Extract inner JSON substring
-                candidate = self._extract_json_substring(cleaned)
-                drug_info = json.loads(candidate)
+            drug_info = self._generate_json(prompt)
 
             # Required keys
             required_fields = [
@@ -523,98 +741,5 @@ Return ONLY valid JSON array of strings:
         """
         Intelligent fallback based on drug name patterns
         """
-        drug_lower = drug_name.lower()
-        
-        # Pattern matching for common drug classes
-        patterns = {
-            # Dementia drugs - NO taper needed
-            ('donepezil', 'aricept', 'memantine', 'namenda', 'rivastigmine', 'exelon', 'galantamine'): {
-                'drug_class': 'Dementia medication',
-                'risk_profile': 'Standard',
-                'requires_taper': False,
-                'typical_duration_weeks': 0,
-                'step_logic': 'Can be discontinued without tapering in most cases',
-                'withdrawal_symptoms': 'Possible cognitive decline, return of dementia symptoms',
-                'special_considerations': 'Discontinuation should be monitored but tapering not required'
-            },
-            
-            # Benzodiazepines - REQUIRE taper
-            ('alprazolam', 'xanax', 'lorazepam', 'ativan', 'diazepam', 'valium', 'clonazepam', 'klonopin'): {
-                'drug_class': 'Benzodiazepine',
-                'risk_profile': 'High-risk',
-                'requires_taper': True,
-                'typical_duration_weeks': 12,
-                'step_logic': 'Ashton protocol - very gradual 10% reduction every 2 weeks',
-                'withdrawal_symptoms': 'Anxiety, insomnia, tremors, seizures, confusion'
-            },
-            
-            # SSRIs - REQUIRE taper
-            ('sertraline', 'zoloft', 'fluoxetine', 'prozac', 'paroxetine', 'paxil', 'citalopram', 'celexa', 'escitalopram', 'lexapro'): {
-                'drug_class': 'SSRI Antidepressant',
-                'risk_profile': 'High-risk',
-                'requires_taper': True,
-                'typical_duration_weeks': 8,
-                'step_logic': 'Hyperbolic taper - reduce by 25% every 2-4 weeks',
-                'withdrawal_symptoms': 'Brain zaps, dizziness, nausea, irritability, flu-like symptoms'
-            },
-            
-            # Statins - NO taper needed
-            ('atorvastatin', 'lipitor', 'simvastatin', 'zocor', 'rosuvastatin', 'crestor', 'pravastatin'): {
-                'drug_class': 'Statin',
-                'risk_profile': 'Low-risk',
-                'requires_taper': False,
-                'typical_duration_weeks': 0,
-                'step_logic': 'Can be stopped abruptly',
-                'withdrawal_symptoms': 'None typically'
-            },
-            
-            # ACE Inhibitors - Minimal taper
-            ('lisinopril', 'enalapril', 'ramipril', 'perindopril', 'benazepril'): {
-                'drug_class': 'ACE Inhibitor',
-                'risk_profile': 'Standard',
-                'requires_taper': False,
-                'typical_duration_weeks': 1,
-                'step_logic': 'Monitor blood pressure for rebound hypertension',
-                'withdrawal_symptoms': 'Possible rebound hypertension'
-            },
-            
-            # PPIs - Minimal taper
-            ('omeprazole', 'prilosec', 'pantoprazole', 'protonix', 'esomeprazole', 'nexium', 'lansoprazole'): {
-                'drug_class': 'Proton Pump Inhibitor',
-                'risk_profile': 'Standard',
-                'requires_taper': True,
-                'typical_duration_weeks': 4,
-                'step_logic': 'Reduce dose by 50% for 2 weeks, then switch to H2 blocker if needed',
-                'withdrawal_symptoms': 'Rebound acid hypersecretion'
-            }
-        }
-        
-        # Check patterns
-        for drug_names, info in patterns.items():
-            if any(pattern in drug_lower for pattern in drug_names):
-                return {
-                    'drug_class': info['drug_class'],
-                    'risk_profile': info.get('risk_profile', 'Standard'),
-                    'taper_strategy_name': 'Evidence-based protocol',
-                    'step_logic': info['step_logic'],
-                    'withdrawal_symptoms': info.get('withdrawal_symptoms', 'General discomfort'),
-                    'monitoring_frequency': 'Weekly',
-                    'pause_criteria': 'Severe symptoms or patient distress',
-                    'requires_taper': info['requires_taper'],
-                    'typical_duration_weeks': info['typical_duration_weeks'],
-                    'special_considerations': info.get('special_considerations', 'Monitor elderly patients closely')
-                }
-        
-        # Generic fallback
-        return {
-            "drug_class": "Unknown",
-            "risk_profile": "Standard",
-            "taper_strategy_name": "Gradual Reduction",
-            "step_logic": "Reduce by 25% every 2 weeks with monitoring",
-            "withdrawal_symptoms": "Possible return of symptoms, general discomfort",
-            "monitoring_frequency": "Weekly",
-            "pause_criteria": "Severe symptoms or patient distress",
-            "requires_taper": True,
-            "typical_duration_weeks": 4,
-            "special_considerations": "Consult healthcare provider for personalized guidance"
-        }
+        # Copy so callers may fill in fields without touching the shared records
+        return dict(_fallback_drug_info(drug_name.lower()))
@@ -1,12 +1,60 @@
+from dataclasses import dataclass
+from functools import lru_cache
 import pandas as pd
 from app.models.patient import PatientInput, Gender
 from app.models.responses import GenderRiskFlag, RiskCategory
 from typing import List
 
+@dataclass(slots=True, frozen=True)
+class GenderRiskRow:
+    """One gender-risk dataset row, as read by the engine"""
+    drug_name: str
+    risk_level: str
+    risk_category: str
+    mechanism: str
+    monitoring_guidance: str
+    # Parsed at load so queries are plain boolean reads
+    female_gt_male: bool
+    high_risk: bool
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _GenderRiskTable:
+    """Gender-risk rows, read-only after engine init. Hashed by identity."""
+    rows: tuple[GenderRiskRow, ...]
+
+@lru_cache(maxsize=1024)
+def _gender_risk_matches(table: _GenderRiskTable, drug_lower: str) -> tuple[GenderRiskRow, ...]:
+    """Gender-risk rows whose drug name contains drug_lower (cached; rows are frozen)"""
+    return tuple(row for row in table.rows if drug_lower in row.drug_name)
+
 class GenderRiskEngine:
     def __init__(self, gender_risk_df: pd.DataFrame):
         self.gender_risk_df = gender_risk_df
         self.gender_risk_df['drug_name'] = self.gender_risk_df['drug_name'].str.lower()
+        
+        # One plain row object per gender-risk row, so matching is a plain
+        # substring test instead of a per-medication column scan
+        columns = ['drug_name', 'risk_level', 'risk_category', 'mechanism',
+                   'monitoring_guidance', 'gender_risk']
+        self._table = _GenderRiskTable(tuple(
+            GenderRiskRow(
+                drug_name, risk_level, risk_category, mechanism, monitoring_guidance,
+                female_gt_male=isinstance(gender_risk, str) and 'Female > Male' in gender_risk,
+                high_risk=risk_level == 'High'
+            )
+            for drug_name, risk_level, risk_category, mechanism, monitoring_guidance, gender_risk
+            in self.gender_risk_df[columns].itertuples(index=False, name=None)
+            if isinstance(drug_name, str)
+        ))
+        
+        # Every substring of the drug names that have a female risk, so a
+        # medication with no matching row is rejected by one set lookup
+        self._female_risk_keys = frozenset(
+            row.drug_name[i:j]
+            for row in self._table.rows if row.female_gt_male
+            for i in range(len(row.drug_name) + 1)
+            for j in range(i, len(row.drug_name) + 1)
+        )
     
     def check_gender_risks(self, patient: PatientInput) -> List[GenderRiskFlag]:
         """Check for gender-specific medication risks"""
@@ -15,22 +63,18 @@ class GenderRiskEngine:
         if patient.gender != Gender.FEMALE:
             return flags  # Currently all risks are Female > Male
         
-        for med in patient.medications:
-            drug_lower = med.generic_name.lower()
-            
+        candidates = [med for med in patient.medications if med.generic_key in self._female_risk_keys]
+        
+        for med in candidates:
             # Match drug in gender risk dataset
-            matches = self.gender_risk_df[
-                self.gender_risk_df['drug_name'].str.contains(drug_lower, na=False)
-            ]
-            
-            for _, row in matches.iterrows():
-                if 'Female > Male' in row['gender_risk']:
+            for row in _gender_risk_matches(self._table, med.generic_key):
+                if row.female_gt_male:
                     flags.append(GenderRiskFlag(
                         drug_name=med.generic_name,
-                        risk_category=row['risk_category'],
-                        risk_level=row['risk_level'],
-                        mechanism=row['mechanism'],
-                        monitoring_guidance=row['monitoring_guidance'],
+                        risk_category=row.risk_category,
+                        risk_level=row.risk_level,
+                        mechanism=row.mechanism,
+                        monitoring_guidance=row.monitoring_guidance,
                         escalation_applied=True
                     ))
         
@@ -48,18 +92,13 @@ class GenderRiskEngine:
         if patient.gender != Gender.FEMALE:
             return modified_risk, reasons
         
-        drug_lower = drug_name.lower()
-        matches = self.gender_risk_df[
-            self.gender_risk_df['drug_name'].str.contains(drug_lower, na=False)
-        ]
-        
-        for _, row in matches.iterrows():
-            if row['risk_level'] == 'High':
+        for row in _gender_risk_matches(self._table, drug_name.lower()):
+            if row.high_risk:
                 if base_risk == RiskCategory.YELLOW:
                     modified_risk = RiskCategory.RED
-                    reasons.append(f"Escalated to RED: High gender-specific risk ({row['risk_category']}) - {row['mechanism']}")
+                    reasons.append(f"Escalated to RED: High gender-specific risk ({row.risk_category}) - {row.mechanism}")
                 elif base_risk == RiskCategory.GREEN:
                     modified_risk = RiskCategory.YELLOW
-                    reasons.append(f"Escalated to YELLOW: Gender-specific {row['risk_category']} risk")
+                    reasons.append(f"Escalated to YELLOW: Gender-specific {row.risk_category} risk")
         
         return modified_risk, reasons
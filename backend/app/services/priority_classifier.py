@@ -1,12 +1,50 @@
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Iterable, Union
 from app.models.patient import PatientInput
 from app.models.responses import (
-    RiskCategory, MedicationRiskAssessment, HerbalInteraction
+    RiskCategory, MedicationRiskAssessment, HerbalInteraction, Severity, EvidenceStrength
 )
 
+# Display labels, looked up once per member rather than per formatted string
+_RISK_LABEL = {risk: risk.label for risk in RiskCategory}
+_EVIDENCE_LABEL = {evidence: evidence.label for evidence in EvidenceStrength}
+
+# One-step escalation GREEN -> YELLOW -> RED, indexed by the int-valued risk
+_ESCALATE = (RiskCategory.YELLOW, RiskCategory.RED, RiskCategory.RED)
+
+# Reason for a one-step escalation, indexed by the risk it escalates from
+_GENDER_ESCALATION_REASONS = (
+    "Gender-specific risk identified",
+    "High gender-specific risk escalation",
+)
+_FRAILTY_ESCALATION_REASONS = (
+    "Frailty-adjusted risk (CFS {cfs})",
+    "Severe frailty (CFS {cfs}) with high-risk medication",
+)
+
+@dataclass(slots=True)
+class HerbBuckets:
+    """Herb-drug interactions pre-split by severity (minor ones are not needed)"""
+    major: List[HerbalInteraction] = field(default_factory=list)
+    moderate: List[HerbalInteraction] = field(default_factory=list)
+    
+    @classmethod
+    def from_list(cls, interactions: Iterable[HerbalInteraction]) -> "HerbBuckets":
+        """Bucket a flat interaction list in one pass"""
+        buckets = cls()
+        for interaction in interactions:
+            severity = interaction.severity
+            if severity == Severity.MAJOR:
+                buckets.major.append(interaction)
+            elif severity == Severity.MODERATE:
+                buckets.moderate.append(interaction)
+        return buckets
+
 class PriorityClassifier:
-    def __init__(self):
-        pass
+    def __init__(self, collect_all_factors: bool = True):
+        # False stops evaluating modifiers once a medication is RED, for callers
+        # that only need the final category; the default keeps every factor
+        self.collect_all_factors = collect_all_factors
     
     def classify_medication(self, 
                           med_name: str,
@@ -17,77 +55,73 @@ class PriorityClassifier:
                           has_ttb_issue: bool,
                           has_gender_risk: bool,
                           has_frailty_escalation: bool,
-                          herb_interactions: List[HerbalInteraction],
+                          herb_interactions: Union[HerbBuckets, List[HerbalInteraction]],
                           patient: PatientInput) -> MedicationRiskAssessment:
         """
         Comprehensive priority classification using all module outputs
         Returns final RED/YELLOW/GREEN classification
+        
+        herb_interactions is ideally already bucketed by severity; a flat
+        list is accepted and bucketed here
         """
         
         risk_factors = []
-        contributing_modules = []
+        contributing_modules: Dict[str, None] = {}  # ordered set
         
         # Step 1: Determine base risk
         base_risk = self._determine_base_risk(acb_score, has_beers, has_stopp)
         
         if acb_score > 0:
             risk_factors.append(f"ACB Score: {acb_score}")
-            contributing_modules.append("ACB Engine")
+            contributing_modules["ACB Engine"] = None
         
         if has_beers:
             risk_factors.append("Beers Criteria matched")
-            contributing_modules.append("Beers Engine")
+            contributing_modules["Beers Engine"] = None
         
         if has_stopp:
             risk_factors.append("STOPP criteria matched")
-            contributing_modules.append("STOPP Engine")
+            contributing_modules["STOPP Engine"] = None
         
         current_risk = base_risk
         
         # Step 2: Apply Time-to-Benefit escalation
-        if has_ttb_issue:
-            if current_risk != RiskCategory.RED:
-                current_risk = RiskCategory.RED
-                risk_factors.append("Time-to-benefit exceeds life expectancy")
-                contributing_modules.append("Time-to-Benefit Engine")
-        
-        # Step 3: Apply Gender-specific risk escalation
-        if has_gender_risk:
-            if current_risk == RiskCategory.GREEN:
-                current_risk = RiskCategory.YELLOW
-                risk_factors.append("Gender-specific risk identified")
-                contributing_modules.append("Gender Risk Engine")
-            elif current_risk == RiskCategory.YELLOW:
-                current_risk = RiskCategory.RED
-                risk_factors.append("High gender-specific risk escalation")
-                contributing_modules.append("Gender Risk Engine")
-        
-        # Step 4: Apply Frailty escalation
-        if has_frailty_escalation:
-            if current_risk == RiskCategory.YELLOW:
-                current_risk = RiskCategory.RED
-                risk_factors.append(f"Severe frailty (CFS {patient.cfs_score}) with high-risk medication")
-                contributing_modules.append("Frailty Risk Engine")
-            elif current_risk == RiskCategory.GREEN:
-                current_risk = RiskCategory.YELLOW
-                risk_factors.append(f"Frailty-adjusted risk (CFS {patient.cfs_score})")
-                contributing_modules.append("Frailty Risk Engine")
+        if has_ttb_issue and current_risk != RiskCategory.RED:
+            current_risk = RiskCategory.RED
+            risk_factors.append("Time-to-benefit exceeds life expectancy")
+            contributing_modules["Time-to-Benefit Engine"] = None
         
-        # Step 5: Apply Herbal Interaction escalation
-        major_interactions = [i for i in herb_interactions if i.severity == "Major"]
-        moderate_interactions = [i for i in herb_interactions if i.severity == "Moderate"]
+        # Step 3: Apply Gender-specific risk escalation (one step)
+        if has_gender_risk and current_risk != RiskCategory.RED:
+            risk_factors.append(_GENDER_ESCALATION_REASONS[current_risk])
+            contributing_modules["Gender Risk Engine"] = None
+            current_risk = _ESCALATE[current_risk]
         
-        if major_interactions:
-            current_risk = RiskCategory.RED
-            for interaction in major_interactions:
-                risk_factors.append(f"Major herb-drug interaction: {interaction.herb_name} ({interaction.evidence_strength.value})")
-            contributing_modules.append("Ayurvedic Interaction Engine")
-        elif moderate_interactions:
-            if current_risk == RiskCategory.GREEN:
+        # Step 4: Apply Frailty escalation (one step)
+        if has_frailty_escalation and current_risk != RiskCategory.RED:
+            risk_factors.append(_FRAILTY_ESCALATION_REASONS[current_risk].format(cfs=patient.cfs_score))
+            contributing_modules["Frailty Risk Engine"] = None
+            current_risk = _ESCALATE[current_risk]
+        
+        # Step 5: Apply Herbal Interaction escalation
+        # (skipped once RED when only the final category is wanted)
+        if current_risk != RiskCategory.RED or self.collect_all_factors:
+            if not isinstance(herb_interactions, HerbBuckets):
+                herb_interactions = HerbBuckets.from_list(herb_interactions)
+            major_interactions = herb_interactions.major
+            moderate_interactions = herb_interactions.moderate
+            
+            if major_interactions:
+                if current_risk != RiskCategory.RED:
+                    current_risk = RiskCategory.RED
+                for interaction in major_interactions:
+                    risk_factors.append(f"Major herb-drug interaction: {interaction.herb_name} ({_EVIDENCE_LABEL[interaction.evidence_strength]})")
+                contributing_modules["Ayurvedic Interaction Engine"] = None
+            elif moderate_interactions and current_risk == RiskCategory.GREEN:
                 current_risk = RiskCategory.YELLOW
                 for interaction in moderate_interactions:
-                    risk_factors.append(f"Moderate herb-drug interaction: {interaction.herb_name} ({interaction.evidence_strength.value})")
-                contributing_modules.append("Ayurvedic Interaction Engine")
+                    risk_factors.append(f"Moderate herb-drug interaction: {interaction.herb_name} ({_EVIDENCE_LABEL[interaction.evidence_strength]})")
+                contributing_modules["Ayurvedic Interaction Engine"] = None
         
         # Final risk is now determined
         final_risk = current_risk
@@ -101,7 +135,7 @@ class PriorityClassifier:
             base_risk=base_risk,
             final_risk=final_risk,
             risk_factors=risk_factors if risk_factors else ["No significant risk factors identified"],
-            contributing_modules=list(set(contributing_modules)) if contributing_modules else ["None"],
+            contributing_modules=list(contributing_modules) if contributing_modules else ["None"],
             justification=justification
         )
     
@@ -126,9 +160,9 @@ class PriorityClassifier:
                                risk_factors: List[str]) -> str:
         """Generate human-readable justification"""
         if not risk_factors or risk_factors == ["No significant risk factors identified"]:
-            return f"Final Classification: {final_risk.value} - Appropriate therapy with favorable risk-benefit ratio."
+            return f"Final Classification: {_RISK_LABEL[final_risk]} - Appropriate therapy with favorable risk-benefit ratio."
         
         if base_risk == final_risk:
-            return f"Final Classification: {final_risk.value} - {'; '.join(risk_factors[:3])}"
+            return f"Final Classification: {_RISK_LABEL[final_risk]} - {'; '.join(risk_factors[:3])}"
         else:
-            return f"Escalated from {base_risk.value} → {final_risk.value} due to: {'; '.join(risk_factors[:3])}"
+            return f"Escalated from {_RISK_LABEL[base_risk]} → {_RISK_LABEL[final_risk]} due to: {'; '.join(risk_factors[:3])}"
@@ -69,9 +69,9 @@ class RiskClassifier:
             risk_factors.extend(frailty_reasons)
         
         # Generate justification
-        justification = f"Base: {base_risk.value}"
+        justification = f"Base: {base_risk.label}"
         if final_risk != base_risk:
-            justification += f" → Final: {final_risk.value}"
+            justification += f" → Final: {final_risk.label}"
         
         return MedicationRiskAssessment(
             medication_name=med_name,
@@ -1,3 +1,5 @@
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from app.models.patient import PatientInput
 from app.models.responses import STOPPFlag
@@ -5,31 +7,42 @@ from app.models.responses import STOPPFlag
 class STOPPEngine:
     def __init__(self, stopp_df: pd.DataFrame):
         self.stopp_df = stopp_df
+        
+        # Lowercased match columns and row records, computed once so each
+        # medication is a pair of NumPy masks instead of a DataFrame filter
+        self._drug_lower = stopp_df['Drug_Medication'].str.lower().fillna('').to_numpy(dtype=str)
+        self._cond_lower = stopp_df['Condition_Disease'].str.lower().fillna('').to_numpy(dtype=str)
+        self._is_stopp = (stopp_df['Type'] == 'STOPP').to_numpy()
+        self._rows = stopp_df.to_dict('records')
     
     def check_stopp_criteria(self, patient: PatientInput) -> list[STOPPFlag]:
         flags = []
         
+        # Condition match does not depend on the medication
+        cond_set = list({c.lower() for c in patient.comorbidities if c})
+        cond_ids = np.flatnonzero(np.isin(self._cond_lower, cond_set) & self._is_stopp)
+        
         for med in patient.medications:
-            drug_lower = med.generic_name.lower()
-            
-            # Match drug or condition
-            matches = self.stopp_df[
-                (self.stopp_df['Drug_Medication'].str.lower().str.contains(drug_lower, na=False)) |
-                (self.stopp_df['Condition_Disease'].str.lower().isin([c.lower() for c in patient.comorbidities]))
-            ]
-            
-            for _, row in matches.iterrows():
-                if row['Type'] == 'STOPP':
-                    flags.append(STOPPFlag(
-                        rule_id=str(row['Rule_ID']),
-                        drug_medication=row['Drug_Medication'],
-                        condition_disease=row['Condition_Disease'],
-                        rationale=row['Rationale_Reason'],
-                        full_text=row['Full_Text']
-                    ))
+            # Match drug or condition (union keeps row order)
+            for idx in np.union1d(self._drug_rows(med.generic_key), cond_ids):
+                row = self._rows[idx]
+                flags.append(STOPPFlag(
+                    rule_id=str(row['Rule_ID']),
+                    drug_medication=row['Drug_Medication'],
+                    condition_disease=row['Condition_Disease'],
+                    rationale=row['Rationale_Reason'],
+                    full_text=row['Full_Text']
+                ))
         
         return flags
     
+    @lru_cache(maxsize=1024)
+    def _drug_rows(self, drug_lower: str) -> np.ndarray:
+        """STOPP rows whose drug text contains this drug (cached; engines are app singletons)"""
+        ids = np.flatnonzero((np.char.find(self._drug_lower, drug_lower) >= 0) & self._is_stopp)
+        ids.flags.writeable = False
+        return ids
+    
     def check_start_criteria(self, patient: PatientInput) -> list[str]:
         # Placeholder for START logic (missing meds)
         return []
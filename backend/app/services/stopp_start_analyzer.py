@@ -1,7 +1,140 @@
+import copy
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Any, NamedTuple, Optional
 import re
 
+
+# Special-case names in _matches_drug
+_TCA_NAMES = frozenset(['amitriptyline', 'nortriptyline', 'imipramine', 'doxepin', 'dosulepin'])
+_FIRST_GENERATION_ANTIHISTAMINES = frozenset(['diphenhydramine', 'chlorpheniramine', 'hydroxyzine', 'promethazine', 'cyclizine'])
+
+
+class STOPPFlagRecord(NamedTuple):
+    """One matched STOPP criterion in an analyze_medication result"""
+    criterion_id: str
+    criterion: str
+    drug_class: str
+    condition: str
+    rationale: str
+    action: str
+    severity: str
+    system: str
+
+
+@lru_cache(maxsize=4096)
+def _lower(text: str) -> str:
+    """Lowercased, stripped text (cached; names and comorbidities repeat across calls)"""
+    return text.lower().strip()
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _CriteriaTable:
+    """
+    Column-wise (structure-of-arrays) view of a STOPP/START sheet. Threshold
+    columns hold NaN where the condition has no such numeric test; the
+    matching *_rule masks mark where it does. Hashed by identity.
+    """
+    records: List[Dict[str, Any]]
+    drug_class_lc: List[str]
+    condition_lc: np.ndarray
+    egfr_lt: np.ndarray
+    sbp_gt: np.ndarray
+    dbp_gt: np.ndarray
+    k_lt: np.ndarray
+    k_gt: np.ndarray
+    na_lt: np.ndarray
+    age_ge: np.ndarray
+    falls: np.ndarray
+    egfr_rule: np.ndarray
+    sbp_rule: np.ndarray
+    dbp_rule: np.ndarray
+    k_rule: np.ndarray
+    na_rule: np.ndarray
+    age_rule: np.ndarray
+
+
+def _parse_thresholds(condition_lower: str) -> tuple:
+    """
+    Numeric tests of one condition text as
+    (egfr_lt, sbp_gt, dbp_gt, k_lt, k_gt, na_lt, age_ge, falls);
+    checks mirror the original per-call substring tests, in the same order
+    """
+    nan = np.nan
+    egfr_lt = sbp_gt = dbp_gt = k_lt = k_gt = na_lt = age_ge = nan
+
+    if 'egfr' in condition_lower:
+        if '<30' in condition_lower or '< 30' in condition_lower:
+            egfr_lt = 30
+        elif '<50' in condition_lower or '< 50' in condition_lower:
+            egfr_lt = 50
+        elif '<15' in condition_lower or '< 15' in condition_lower:
+            egfr_lt = 15
+
+    if 'sbp' in condition_lower or 'systolic' in condition_lower:
+        if '>160' in condition_lower:
+            sbp_gt = 160
+        elif '>140' in condition_lower:
+            sbp_gt = 140
+
+    if 'dbp' in condition_lower or 'diastolic' in condition_lower:
+        if '>90' in condition_lower:
+            dbp_gt = 90
+
+    if 'k+' in condition_lower or 'potassium' in condition_lower:
+        if '<3.0' in condition_lower:
+            k_lt = 3.0
+        elif '>6.0' in condition_lower:
+            k_gt = 6.0
+
+    if 'na+' in condition_lower or 'sodium' in condition_lower:
+        if '<130' in condition_lower:
+            na_lt = 130
+
+    if 'age' in condition_lower:
+        if '≥65' in condition_lower or '>= 65' in condition_lower or '>65' in condition_lower:
+            age_ge = 65
+        elif '≥85' in condition_lower or '>= 85' in condition_lower:
+            age_ge = 85
+
+    return egfr_lt, sbp_gt, dbp_gt, k_lt, k_gt, na_lt, age_ge, 'fall' in condition_lower
+
+
+@lru_cache(maxsize=4096)
+def _comorbidity_hits(table: _CriteriaTable, condition_norm: str) -> np.ndarray:
+    """Criteria whose condition text and this comorbidity contain one another (read-only)"""
+    conditions = table.condition_lc
+    hits = (np.char.find(conditions, condition_norm) >= 0) | (np.char.find(condition_norm, conditions) >= 0)
+    hits.flags.writeable = False
+    return hits
+
+
+def _compile_criteria(df: pd.DataFrame) -> _CriteriaTable:
+    """Lowercase and parse a criteria sheet once, column by column"""
+    records = df.to_dict('records')
+    condition_lc = [str(r['condition']).lower() for r in records]
+    columns = list(zip(*(_parse_thresholds(c) for c in condition_lc))) or [()] * 8
+    egfr_lt, sbp_gt, dbp_gt, k_lt, k_gt, na_lt, age_ge = (
+        np.array(col, dtype=np.float64) for col in columns[:7]
+    )
+    return _CriteriaTable(
+        records=records,
+        drug_class_lc=[str(r['drug_class']).lower() for r in records],
+        condition_lc=np.array(condition_lc, dtype=str),
+        egfr_lt=egfr_lt, sbp_gt=sbp_gt, dbp_gt=dbp_gt,
+        k_lt=k_lt, k_gt=k_gt, na_lt=na_lt, age_ge=age_ge,
+        falls=np.array(columns[7], dtype=bool),
+        egfr_rule=~np.isnan(egfr_lt),
+        sbp_rule=~np.isnan(sbp_gt),
+        dbp_rule=~np.isnan(dbp_gt),
+        k_rule=~np.isnan(k_lt) | ~np.isnan(k_gt),
+        na_rule=~np.isnan(na_lt),
+        age_rule=~np.isnan(age_ge),
+    )
+
+
 class STOPPSTARTAnalyzer:
     """Analyzer for STOPP/START v2 clinical criteria"""
     
@@ -11,32 +144,63 @@ class STOPPSTARTAnalyzer:
         
         # Drug class mappings for better matching
         self.drug_class_map = self._build_drug_class_map()
+        
+        # Known medication -> classes whose mapped names occur in it
+        self._med_to_classes = {
+            med: tuple(
+                drug_class for drug_class, medications in self.drug_class_map.items()
+                if any(other in med for other in medications)
+            )
+            for meds in self.drug_class_map.values() for med in meds
+        }
+        
+        # Criteria compiled once, so per-call matching is array work
+        self._stopp = _compile_criteria(stopp_df)
+        self._start = _compile_criteria(start_df)
+        
+        # Immutable flag per STOPP row, shared by every result that matches it
+        self._stopp_flags = [
+            STOPPFlagRecord(*(criterion[field] for field in STOPPFlagRecord._fields))
+            for criterion in self._stopp.records
+        ]
+        
+        # Inverted index: known medication name -> STOPP rows its class triggers
+        self._med_to_criterion_ids = self._build_criterion_index()
+        
+        # Criteria statistics, computed once (see refresh_stats)
+        self.refresh_stats()
     
-    def _build_drug_class_map(self) -> Dict[str, List[str]]:
+    def _build_drug_class_map(self) -> Dict[str, frozenset]:
         """Build mapping of drug classes to specific medications"""
         return {
-            'benzodiazepines': ['alprazolam', 'lorazepam', 'diazepam', 'clonazepam', 'temazepam', 'triazolam', 'zolpidem', 'zaleplon', 'eszopiclone'],
-            'tricyclic antidepressants': ['amitriptyline', 'nortriptyline', 'imipramine', 'doxepin', 'desipramine', 'clomipramine'],
-            'ssri': ['fluoxetine', 'sertraline', 'paroxetine', 'citalopram', 'escitalopram', 'fluvoxamine'],
-            'nsaid': ['ibuprofen', 'naproxen', 'diclofenac', 'celecoxib', 'meloxicam', 'indomethacin', 'ketorolac', 'piroxicam'],
-            'ppi': ['omeprazole', 'esomeprazole', 'lansoprazole', 'pantoprazole', 'rabeprazole'],
-            'antihistamines': ['diphenhydramine', 'chlorpheniramine', 'hydroxyzine', 'promethazine', 'cyclizine'],
-            'antipsychotics': ['haloperidol', 'risperidone', 'quetiapine', 'olanzapine', 'aripiprazole', 'chlorpromazine'],
-            'opioids': ['morphine', 'oxycodone', 'hydrocodone', 'fentanyl', 'tramadol', 'codeine', 'hydromorphone'],
-            'acei': ['lisinopril', 'enalapril', 'ramipril', 'captopril', 'perindopril', 'quinapril'],
-            'arb': ['losartan', 'valsartan', 'irbesartan', 'candesartan', 'olmesartan', 'telmisartan'],
-            'beta-blocker': ['metoprolol', 'atenolol', 'bisoprolol', 'carvedilol', 'propranolol', 'nebivolol'],
-            'thiazide': ['hydrochlorothiazide', 'chlorthalidone', 'indapamide', 'metolazone'],
-            'loop diuretic': ['furosemide', 'torsemide', 'bumetanide', 'ethacrynic acid'],
-            'statin': ['atorvastatin', 'simvastatin', 'rosuvastatin', 'pravastatin', 'lovastatin', 'fluvastatin'],
-            'anticoagulant': ['warfarin', 'apixaban', 'rivaroxaban', 'dabigatran', 'edoxaban'],
-            'antiplatelet': ['aspirin', 'clopidogrel', 'prasugrel', 'ticagrelor'],
-            'sulfonylurea': ['glyburide', 'glipizide', 'glimepiride', 'chlorpropamide'],
-            'bisphosphonate': ['alendronate', 'risedronate', 'ibandronate', 'zoledronic acid'],
-            'alpha-blocker': ['tamsulosin', 'doxazosin', 'alfuzosin', 'terazosin'],
-            'anticholinergic': ['oxybutynin', 'tolterodine', 'solifenacin', 'darifenacin', 'fesoterodine']
+            'benzodiazepines': frozenset(['alprazolam', 'lorazepam', 'diazepam', 'clonazepam', 'temazepam', 'triazolam', 'zolpidem', 'zaleplon', 'eszopiclone']),
+            'tricyclic antidepressants': frozenset(['amitriptyline', 'nortriptyline', 'imipramine', 'doxepin', 'desipramine', 'clomipramine']),
+            'ssri': frozenset(['fluoxetine', 'sertraline', 'paroxetine', 'citalopram', 'escitalopram', 'fluvoxamine']),
+            'nsaid': frozenset(['ibuprofen', 'naproxen', 'diclofenac', 'celecoxib', 'meloxicam', 'indomethacin', 'ketorolac', 'piroxicam']),
+            'ppi': frozenset(['omeprazole', 'esomeprazole', 'lansoprazole', 'pantoprazole', 'rabeprazole']),
+            'antihistamines': frozenset(['diphenhydramine', 'chlorpheniramine', 'hydroxyzine', 'promethazine', 'cyclizine']),
+            'antipsychotics': frozenset(['haloperidol', 'risperidone', 'quetiapine', 'olanzapine', 'aripiprazole', 'chlorpromazine']),
+            'opioids': frozenset(['morphine', 'oxycodone', 'hydrocodone', 'fentanyl', 'tramadol', 'codeine', 'hydromorphone']),
+            'acei': frozenset(['lisinopril', 'enalapril', 'ramipril', 'captopril', 'perindopril', 'quinapril']),
+            'arb': frozenset(['losartan', 'valsartan', 'irbesartan', 'candesartan', 'olmesartan', 'telmisartan']),
+            'beta-blocker': frozenset(['metoprolol', 'atenolol', 'bisoprolol', 'carvedilol', 'propranolol', 'nebivolol']),
+            'thiazide': frozenset(['hydrochlorothiazide', 'chlorthalidone', 'indapamide', 'metolazone']),
+            'loop diuretic': frozenset(['furosemide', 'torsemide', 'bumetanide', 'ethacrynic acid']),
+            'statin': frozenset(['atorvastatin', 'simvastatin', 'rosuvastatin', 'pravastatin', 'lovastatin', 'fluvastatin']),
+            'anticoagulant': frozenset(['warfarin', 'apixaban', 'rivaroxaban', 'dabigatran', 'edoxaban']),
+            'antiplatelet': frozenset(['aspirin', 'clopidogrel', 'prasugrel', 'ticagrelor']),
+            'sulfonylurea': frozenset(['glyburide', 'glipizide', 'glimepiride', 'chlorpropamide']),
+            'bisphosphonate': frozenset(['alendronate', 'risedronate', 'ibandronate', 'zoledronic acid']),
+            'alpha-blocker': frozenset(['tamsulosin', 'doxazosin', 'alfuzosin', 'terazosin']),
+            'anticholinergic': frozenset(['oxybutynin', 'tolterodine', 'solifenacin', 'darifenacin', 'fesoterodine'])
         }
     
+    def _build_criterion_index(self) -> Dict[str, np.ndarray]:
+        """Map every mapped medication name to the STOPP row ids it matches"""
+        known_meds = {med for meds in self.drug_class_map.values() for med in meds}
+        known_meds.update(_TCA_NAMES, _FIRST_GENERATION_ANTIHISTAMINES)  # special cases in _matches_drug
+        return {med: self._match_stopp_rows(med) for med in known_meds}
+    
     def analyze_medication(self, 
                           drug_name: str, 
                           patient_conditions: List[str],
@@ -52,30 +216,47 @@ class STOPPSTARTAnalyzer:
         Returns:
             Dict with stopp_flags, severity, and should_stop
         """
-        flags = []
-        
-        # Normalize drug name
-        drug_lower = drug_name.lower().strip()
-        
-        # Check each STOPP criterion
-        for _, criterion in self.stopp_df.iterrows():
-            # Check if drug matches
-            if self._matches_drug(drug_lower, criterion['drug_class']):
-                # Check if patient condition matches
-                if self._matches_condition(patient_conditions, patient_data, criterion['condition']):
-                    flags.append({
-                        'criterion_id': criterion['criterion_id'],
-                        'criterion': criterion['criterion'],
-                        'drug_class': criterion['drug_class'],
-                        'condition': criterion['condition'],
-                        'rationale': criterion['rationale'],
-                        'action': criterion['action'],
-                        'severity': criterion['severity'],
-                        'system': criterion['system']
-                    })
+        return self.analyze_medications([drug_name], patient_conditions, patient_data)[0]
+    
+    def analyze_medications(self, 
+                            drug_names: List[str], 
+                            patient_conditions: List[str],
+                            patient_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Check a whole medication list against STOPP criteria at once
+        
+        Patient conditions are evaluated once and shared by every drug.
+        
+        Returns:
+            One analyze_medication result per drug, in drug_names order
+        """
+        met = None
+        results = []
+        conditions = frozenset(_lower(c) for c in patient_conditions)
+        
+        for drug_name in drug_names:
+            # Normalize drug name
+            drug_lower = _lower(drug_name)
+            
+            # Candidate criteria by drug class, then keep those whose condition the patient meets
+            candidate_ids = self._med_to_criterion_ids.get(drug_lower)
+            if candidate_ids is None:
+                candidate_ids = self._stopp_criterion_ids(drug_lower)
+            if len(candidate_ids):
+                if met is None:
+                    met = self._condition_mask(self._stopp, conditions, patient_data)
+                candidate_ids = candidate_ids[met[candidate_ids]]
+            
+            results.append(self._stopp_result(candidate_ids))
+        
+        return results
+    
+    def _stopp_result(self, criterion_ids: np.ndarray) -> Dict[str, Any]:
+        """Build the analyze_medication result for the matched STOPP rows"""
+        flags = [self._stopp_flags[idx] for idx in criterion_ids]
         
         # Determine overall severity
-        has_high = any(f['severity'] == 'High' for f in flags)
+        has_high = any(f.severity == 'High' for f in flags)
         overall_severity = 'High' if has_high else 'Moderate' if flags else 'None'
         
         return {
@@ -103,131 +284,121 @@ class STOPPSTARTAnalyzer:
         recommendations = []
         
         # Normalize current medications
-        current_meds_lower = [med.lower().strip() for med in current_medications]
-        
-        for _, criterion in self.start_df.iterrows():
-            # Check if patient meets the condition for this START criterion
-            if self._matches_condition(patient_conditions, patient_data, criterion['condition']):
-                # Check if patient is NOT already on this medication class
-                if not self._already_on_medication(current_meds_lower, criterion['drug_class']):
-                    recommendations.append({
-                        'criterion_id': criterion['criterion_id'],
-                        'criterion': criterion['criterion'],
-                        'drug_class': criterion['drug_class'],
-                        'condition': criterion['condition'],
-                        'indication': criterion['indication'],
-                        'recommendation': criterion['recommendation'],
-                        'evidence': criterion['evidence'],
-                        'system': criterion['system']
-                    })
+        current_meds_lower = [_lower(med) for med in current_medications]
+        
+        # START criteria whose condition the patient meets
+        conditions = frozenset(_lower(c) for c in patient_conditions)
+        met = self._condition_mask(self._start, conditions, patient_data)
+        for idx in np.flatnonzero(met):
+            criterion = self._start.records[idx]
+            # Check if patient is NOT already on this medication class
+            if not self._already_on_medication(current_meds_lower, self._start.drug_class_lc[idx]):
+                recommendations.append({
+                    'criterion_id': criterion['criterion_id'],
+                    'criterion': criterion['criterion'],
+                    'drug_class': criterion['drug_class'],
+                    'condition': criterion['condition'],
+                    'indication': criterion['indication'],
+                    'recommendation': criterion['recommendation'],
+                    'evidence': criterion['evidence'],
+                    'system': criterion['system']
+                })
         
         # Sort by evidence level (Strong first)
         recommendations.sort(key=lambda x: 0 if x['evidence'] == 'Strong' else 1)
         
         return recommendations
     
-    def _matches_drug(self, drug_name: str, drug_class_pattern: str) -> bool:
-        """Check if drug matches the drug class pattern"""
-        drug_lower = drug_name.lower()
-        pattern_lower = drug_class_pattern.lower()
-        
+    def _matches_drug(self, drug_lower: str, pattern_lower: str) -> bool:
+        """Check if drug matches the drug class pattern (both already lowercased)"""
         # Direct substring match
         if drug_lower in pattern_lower or pattern_lower in drug_lower:
             return True
         
-        # Check drug class mappings
-        for drug_class, medications in self.drug_class_map.items():
-            if drug_class in pattern_lower:
-                if any(med in drug_lower for med in medications):
-                    return True
-            # Check if drug is in the medication list
-            if drug_lower in medications:
+        # Check drug class mappings (known medications via the reverse map)
+        classes = self._med_to_classes.get(drug_lower)
+        if classes is not None:
+            if any(drug_class in pattern_lower for drug_class in classes):
+                return True
+        else:
+            for drug_class, medications in self.drug_class_map.items():
                 if drug_class in pattern_lower:
-                    return True
+                    if any(med in drug_lower for med in medications):
+                        return True
         
         # Special pattern matching
         # TCAs
         if 'tricyclic' in pattern_lower or 'tca' in pattern_lower:
-            if drug_lower in ['amitriptyline', 'nortriptyline', 'imipramine', 'doxepin', 'dosulepin']:
+            if drug_lower in _TCA_NAMES:
                 return True
         
         # First-generation antihistamines
         if 'first-generation' in pattern_lower or 'antihistamine' in pattern_lower:
-            if drug_lower in ['diphenhydramine', 'chlorpheniramine', 'hydroxyzine', 'promethazine', 'cyclizine']:
+            if drug_lower in _FIRST_GENERATION_ANTIHISTAMINES:
                 return True
         
         return False
     
-    def _matches_condition(self, 
-                          patient_conditions: List[str],
-                          patient_data: Dict[str, Any],
-                          criterion_condition: str) -> bool:
-        """Check if patient meets the condition criteria"""
-        condition_lower = criterion_condition.lower()
-        
-        # Check comorbidities
-        for condition in patient_conditions:
-            condition_norm = condition.lower().strip()
-            if condition_norm in condition_lower or condition_lower in condition_norm:
-                return True
+    def _match_stopp_rows(self, drug_lower: str) -> np.ndarray:
+        """STOPP row ids whose drug class covers this drug (read-only)"""
+        ids = np.asarray(
+            [i for i, pattern in enumerate(self._stopp.drug_class_lc)
+             if self._matches_drug(drug_lower, pattern)],
+            dtype=np.int32
+        )
+        ids.flags.writeable = False
+        return ids
+    
+    @lru_cache(maxsize=1024)
+    def _stopp_criterion_ids(self, drug_lower: str) -> np.ndarray:
+        """Row ids for names outside the index (cached; engines are app singletons)"""
+        return self._match_stopp_rows(drug_lower)
+    
+    @staticmethod
+    def _condition_mask(table: _CriteriaTable,
+                        patient_conditions: frozenset,
+                        patient_data: Dict[str, Any]) -> np.ndarray:
+        """
+        Check, for every criterion at once, if patient meets the condition;
+        patient_conditions are already lowercased and stripped
+        """
+        # Check comorbidities (substring either way)
+        matched = np.zeros(len(table.records), dtype=bool)
+        for condition_norm in patient_conditions:
+            matched |= _comorbidity_hits(table, condition_norm)
+        
+        # Clinical parameter tests, in priority order: the first test that
+        # applies to a criterion (threshold present and value known) decides it
+        egfr = patient_data.get('egfr') or patient_data.get('creatinine_clearance')
+        sbp = patient_data.get('systolic_bp')
+        dbp = patient_data.get('diastolic_bp')
+        k = patient_data.get('potassium')
+        na = patient_data.get('sodium')
+        age = patient_data.get('age')
         
-        # Check specific clinical parameters
-        # eGFR checks
-        if 'egfr' in condition_lower:
-            egfr = patient_data.get('egfr') or patient_data.get('creatinine_clearance')
+        tests = []
+        with np.errstate(invalid='ignore'):
             if egfr is not None:
-                if '<30' in condition_lower or '< 30' in condition_lower:
-                    return egfr < 30
-                elif '<50' in condition_lower or '< 50' in condition_lower:
-                    return egfr < 50
-                elif '<15' in condition_lower or '< 15' in condition_lower:
-                    return egfr < 15
-        
-        # Blood pressure checks
-        if 'sbp' in condition_lower or 'systolic' in condition_lower:
-            sbp = patient_data.get('systolic_bp')
+                tests.append((table.egfr_rule, egfr < table.egfr_lt))
             if sbp is not None:
-                if '>160' in condition_lower:
-                    return sbp > 160
-                elif '>140' in condition_lower:
-                    return sbp > 140
-        
-        if 'dbp' in condition_lower or 'diastolic' in condition_lower:
-            dbp = patient_data.get('diastolic_bp')
+                tests.append((table.sbp_rule, sbp > table.sbp_gt))
             if dbp is not None:
-                if '>90' in condition_lower:
-                    return dbp > 90
-        
-        # Electrolyte checks
-        if 'k+' in condition_lower or 'potassium' in condition_lower:
-            k = patient_data.get('potassium')
+                tests.append((table.dbp_rule, dbp > table.dbp_gt))
             if k is not None:
-                if '<3.0' in condition_lower:
-                    return k < 3.0
-                elif '>6.0' in condition_lower:
-                    return k > 6.0
-        
-        if 'na+' in condition_lower or 'sodium' in condition_lower:
-            na = patient_data.get('sodium')
+                tests.append((table.k_rule, (k < table.k_lt) | (k > table.k_gt)))
             if na is not None:
-                if '<130' in condition_lower:
-                    return na < 130
-        
-        # Falls check
-        if 'fall' in condition_lower:
-            recent_falls = patient_data.get('recent_falls', False)
-            return recent_falls
-        
-        # Age-related conditions
-        if 'age' in condition_lower:
-            age = patient_data.get('age')
+                tests.append((table.na_rule, na < table.na_lt))
+            tests.append((table.falls, bool(patient_data.get('recent_falls', False))))
             if age is not None:
-                if '≥65' in condition_lower or '>= 65' in condition_lower or '>65' in condition_lower:
-                    return age >= 65
-                elif '≥85' in condition_lower or '>= 85' in condition_lower:
-                    return age >= 85
+                tests.append((table.age_rule, age >= table.age_ge))
         
-        return False
+        decided = matched.copy()
+        for applies, outcome in tests:
+            take = applies & ~decided
+            matched |= take & outcome
+            decided |= take
+        
+        return matched
     
     def _already_on_medication(self, current_medications: List[str], drug_class: str) -> bool:
         """Check if patient is already on medication from this class"""
@@ -236,20 +407,28 @@ class STOPPSTARTAnalyzer:
                 return True
         return False
     
-    def get_stopp_statistics(self) -> Dict[str, Any]:
-        """Get statistics about STOPP criteria"""
-        return {
+    def refresh_stats(self) -> None:
+        """Recompute the cached criteria statistics from stopp_df/start_df"""
+        stopp_severity = self.stopp_df['severity'].value_counts()
+        self._stopp_stats = {
             'total_criteria': len(self.stopp_df),
-            'high_severity': len(self.stopp_df[self.stopp_df['severity'] == 'High']),
-            'moderate_severity': len(self.stopp_df[self.stopp_df['severity'] == 'Moderate']),
+            'high_severity': int(stopp_severity.get('High', 0)),
+            'moderate_severity': int(stopp_severity.get('Moderate', 0)),
             'by_system': self.stopp_df['system'].value_counts().to_dict()
         }
-    
-    def get_start_statistics(self) -> Dict[str, Any]:
-        """Get statistics about START criteria"""
-        return {
+        
+        start_evidence = self.start_df['evidence'].value_counts()
+        self._start_stats = {
             'total_criteria': len(self.start_df),
-            'strong_evidence': len(self.start_df[self.start_df['evidence'] == 'Strong']),
-            'moderate_evidence': len(self.start_df[self.start_df['evidence'] == 'Moderate']),
+            'strong_evidence': int(start_evidence.get('Strong', 0)),
+            'moderate_evidence': int(start_evidence.get('Moderate', 0)),
             'by_system': self.start_df['system'].value_counts().to_dict()
         }
+    
+    def get_stopp_statistics(self) -> Dict[str, Any]:
+        """Get statistics about STOPP criteria"""
+        return copy.deepcopy(self._stopp_stats)
+    
+    def get_start_statistics(self) -> Dict[str, Any]:
+        """Get statistics about START criteria"""
+        return copy.deepcopy(self._start_stats)
@@ -1,141 +1,312 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
 from app.models.patient import PatientInput
 from app.models.responses import STOPPFlag
 
+
+class StartCriterionMatch(NamedTuple):
+    """One START criterion whose medication the patient is missing"""
+    criterion_id: str
+    system: str
+    criterion: str
+    drug_class: str
+    condition: str
+    indication: str
+    recommendation: str
+    evidence: str
+
+
+@lru_cache(maxsize=4096)
+def _lower(text: str) -> str:
+    """Lowercased text (cached; criteria and comorbidity strings repeat across calls)"""
+    return text.lower()
+
+
+def _patient_conditions(patient: PatientInput) -> frozenset:
+    """Lowercased, stripped comorbidities, built once per check rather than per criterion"""
+    return frozenset(_lower(condition).strip() for condition in patient.comorbidities)
+
+
+# Condition rule kinds: what decides a criterion once no comorbidity matched
+_RULE_NONE, _RULE_AGE, _RULE_ALWAYS, _RULE_COMORBIDITY = range(4)
+
+# Comorbidities a condition can name to be decided by the comorbidity list,
+# each with a bit so a patient's named comorbidities pack into one small int
+_NAMED_COMORBIDITIES = ('diabetes', 'hypertension', 'heart failure', 'dementia')
+_COMORBIDITY_BITS = {name: 1 << i for i, name in enumerate(_NAMED_COMORBIDITIES)}
+
+
+@lru_cache(maxsize=1024)
+def _condition_rule(condition_lower: str) -> tuple:
+    """
+    Specialize one criterion condition into a (kind, argument) rule, so the
+    text is scanned once per process rather than on every patient check
+    """
+    # Check age-related conditions
+    if 'age' in condition_lower:
+        if '≥65' in condition_lower or '>= 65' in condition_lower or '>65' in condition_lower:
+            return _RULE_AGE, 65
+        elif '≥85' in condition_lower or '>= 85' in condition_lower:
+            return _RULE_AGE, 85
+
+    # Check for specific blood pressure conditions
+    if 'sbp' in condition_lower or 'systolic' in condition_lower:
+        if '>160' in condition_lower:
+            return _RULE_ALWAYS, None  # Would need actual BP data
+
+    # Diabetes, hypertension, heart failure, dementia: decided by comorbidity list
+    for comorbidity in _NAMED_COMORBIDITIES:
+        if comorbidity in condition_lower:
+            return _RULE_COMORBIDITY, comorbidity
+
+    return _RULE_NONE, None
+
+
+# Common drug class mappings
+_DRUG_MAPPINGS = {
+    'benzodiazepine': ('alprazolam', 'lorazepam', 'diazepam', 'clonazepam', 'temazepam'),
+    'z-drug': ('zolpidem', 'zopiclone', 'eszopiclone'),
+    'nsaid': ('ibuprofen', 'naproxen', 'diclofenac', 'celecoxib', 'meloxicam'),
+    'ppi': ('omeprazole', 'esomeprazole', 'lansoprazole', 'pantoprazole'),
+    'ssri': ('fluoxetine', 'sertraline', 'paroxetine', 'citalopram', 'escitalopram'),
+    'tricyclic': ('amitriptyline', 'nortriptyline', 'imipramine', 'doxepin'),
+    'antihistamine': ('diphenhydramine', 'chlorpheniramine', 'hydroxyzine'),
+    'digoxin': ('digoxin',),
+    'thiazide': ('hydrochlorothiazide', 'chlorthalidone'),
+    'loop diuretic': ('furosemide', 'torsemide', 'bumetanide'),
+    'statin': ('atorvastatin', 'simvastatin', 'rosuvastatin', 'pravastatin'),
+    'anticoagulant': ('warfarin', 'apixaban', 'rivaroxaban', 'dabigatran'),
+    'antiplatelet': ('aspirin', 'clopidogrel'),
+    'acei': ('lisinopril', 'enalapril', 'ramipril'),
+    'arb': ('losartan', 'valsartan', 'irbesartan'),
+    'beta-blocker': ('metoprolol', 'atenolol', 'bisoprolol', 'carvedilol'),
+}
+
+
+# Inverted index: medication name -> its mapped class
+_MED_TO_CLASS = {
+    med: drug_class for drug_class, medications in _DRUG_MAPPINGS.items() for med in medications
+}
+
+
+# One bit per mapped class (at most 64), so class sets pack into a uint64
+_CLASS_BITS = {drug_class: 1 << i for i, drug_class in enumerate(_DRUG_MAPPINGS)}
+
+
+@lru_cache(maxsize=1024)
+def _drug_class_bits(drug_lower: str) -> int:
+    """Bits of the mapped classes whose medication names occur in the drug name"""
+    bits = 0
+    for med, drug_class in _MED_TO_CLASS.items():
+        if med in drug_lower:
+            bits |= _CLASS_BITS[drug_class]
+    return bits
+
+
+@lru_cache(maxsize=1024)
+def _pattern_class_bits(pattern_lower: str) -> int:
+    """Bits of the mapped class names that occur in a criterion's drug class pattern"""
+    bits = 0
+    for drug_class, bit in _CLASS_BITS.items():
+        if drug_class in pattern_lower:
+            bits |= bit
+    return bits
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _DrugPatternTable:
+    """
+    Column-wise view of a criteria sheet's drug class patterns: the
+    lowercased text plus a uint64 bitmask of the mapped classes each one
+    names. Hashed by identity.
+    """
+    patterns: np.ndarray
+    class_bits: np.ndarray
+
+    @classmethod
+    def from_patterns(cls, patterns_lower: List[str]) -> '_DrugPatternTable':
+        class_bits = np.array([_pattern_class_bits(p) for p in patterns_lower], dtype=np.uint64)
+        class_bits.flags.writeable = False
+        return cls(patterns=np.array(patterns_lower, dtype=str), class_bits=class_bits)
+
+
+@lru_cache(maxsize=4096)
+def _drug_match_ids(table: _DrugPatternTable, drug_lower: str) -> np.ndarray:
+    """
+    Indices of the patterns a drug matches, ascending (read-only): a direct
+    substring either way, or a mapped class of the drug named in the pattern
+    """
+    patterns = table.patterns
+    matched = (np.char.find(patterns, drug_lower) >= 0) | (np.char.find(drug_lower, patterns) >= 0)
+    bits = _drug_class_bits(drug_lower)
+    if bits:
+        matched |= (table.class_bits & np.uint64(bits)) != 0
+    ids = np.flatnonzero(matched)
+    ids.flags.writeable = False
+    return ids
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _ConditionTable:
+    """
+    Column-wise view of a criteria sheet's conditions, one entry per row:
+    the lowercased text plus its compiled rule (NaN age_ge where the rule is
+    not an age threshold, 0 comorbidity_bits where it is not a named
+    comorbidity). Hashed by identity.
+    """
+    condition_lc: np.ndarray
+    age_ge: np.ndarray
+    always: np.ndarray
+    comorbidity_bits: np.ndarray
+
+    @classmethod
+    def from_conditions(cls, conditions: pd.Series) -> '_ConditionTable':
+        condition_lc = conditions.str.lower().tolist()
+        rules = [_condition_rule(c) for c in condition_lc]
+        return cls(
+            condition_lc=np.array(condition_lc, dtype=str),
+            age_ge=np.array([arg if kind == _RULE_AGE else np.nan for kind, arg in rules], dtype=np.float64),
+            always=np.array([kind == _RULE_ALWAYS for kind, _ in rules], dtype=bool),
+            comorbidity_bits=np.array(
+                [_COMORBIDITY_BITS[arg] if kind == _RULE_COMORBIDITY else 0 for kind, arg in rules],
+                dtype=np.uint8,
+            ),
+        )
+
+    def mask(self, patient_conds: frozenset, age: int) -> np.ndarray:
+        """
+        Rows whose condition the patient meets: a comorbidity hit, else the
+        compiled rule. Comorbidity hits are cached per distinct comorbidity.
+        """
+        met = self.always | (age >= self.age_ge)
+        named = 0
+        for condition_norm in patient_conds:
+            met |= _condition_hits(self, condition_norm)
+            named |= _COMORBIDITY_BITS.get(condition_norm, 0)
+        if named:
+            met |= (self.comorbidity_bits & np.uint8(named)) != 0
+        return met
+
+
+@lru_cache(maxsize=4096)
+def _condition_hits(table: _ConditionTable, condition_norm: str) -> np.ndarray:
+    """Rows whose condition text and this comorbidity contain one another (read-only)"""
+    conditions = table.condition_lc
+    hits = (np.char.find(conditions, condition_norm) >= 0) | (np.char.find(condition_norm, conditions) >= 0)
+    hits.flags.writeable = False
+    return hits
+
+
 class STOPPStartEngine:
     def __init__(self, stopp_df: pd.DataFrame, start_df: pd.DataFrame):
         self.stopp_df = stopp_df
         self.start_df = start_df
 
+        # Criteria as namedtuples, built once; attribute reads replace per-row Series.
+        # drug_class_lc holds the pattern lowercased up front for drug matching
+        self._stopp_rows = list(
+            stopp_df.assign(drug_class_lc=stopp_df['drug_class'].str.lower()).itertuples(index=False)
+        )
+        self._start_rows = list(
+            start_df.assign(drug_class_lc=start_df['drug_class'].str.lower()).itertuples(index=False)
+        )
+
+        # START results are immutable, so each row's record is built once and shared
+        self._start_matches = [
+            StartCriterionMatch(
+                criterion.criterion_id, criterion.system, criterion.criterion, criterion.drug_class,
+                criterion.condition, criterion.indication, criterion.recommendation, criterion.evidence
+            )
+            for criterion in self._start_rows
+        ]
+
+        # Per-row STOPPFlag fields, with full_text formatted once. Rows whose
+        # fields are all text skip validation; others are still validated
+        self._stopp_flag_fields = [
+            (
+                STOPPFlag.model_construct if all(
+                    isinstance(v, str) for v in (criterion.criterion_id, criterion.condition, criterion.rationale)
+                ) else STOPPFlag,
+                criterion.criterion_id, criterion.condition, criterion.rationale,
+                f"{criterion.criterion} - Action: {criterion.action}",
+            )
+            for criterion in self._stopp_rows
+        ]
+
+        # Drug class patterns with their mapped class ids, so a drug is matched
+        # against every criterion of a sheet with a few array operations
+        self._stopp_drugs = _DrugPatternTable.from_patterns([c.drug_class_lc for c in self._stopp_rows])
+        self._start_drugs = _DrugPatternTable.from_patterns([c.drug_class_lc for c in self._start_rows])
+
+        # Condition columns compiled once, so each check evaluates all criteria
+        # as boolean masks instead of testing conditions row by row
+        self._stopp_conditions = _ConditionTable.from_conditions(stopp_df['condition'])
+        self._start_conditions = _ConditionTable.from_conditions(start_df['condition'])
+
     def check_stopp_criteria(self, patient: PatientInput) -> List[STOPPFlag]:
         """Check STOPP v2 criteria - medications to avoid/stop"""
-        flags = []
-
-        for med in patient.medications:
-            drug_lower = med.generic_name.lower()
-
-            # Check each STOPP criterion
-            for _, criterion in self.stopp_df.iterrows():
-                if self._matches_drug(drug_lower, criterion['drug_class']):
-                    if self._matches_condition(patient, criterion['condition']):
-                        flags.append(STOPPFlag(
-                            rule_id=criterion['criterion_id'],
-                            drug_medication=med.generic_name,
-                            condition_disease=criterion['condition'],
-                            rationale=criterion['rationale'],
-                            full_text=f"{criterion['criterion']} - Action: {criterion['action']}"
-                        ))
-
-        return flags
-
-    def check_start_criteria(self, patient: PatientInput) -> List[Dict]:
+        return list(self._stopp_result(
+            tuple(m.generic_name for m in patient.medications), _patient_conditions(patient), patient.age
+        ))
+
+    def check_start_criteria(self, patient: PatientInput) -> List[StartCriterionMatch]:
         """Check START v2 criteria - potentially beneficial medications missing"""
-        recommendations = []
-
-        # Get list of current medications (lowercase)
-        current_meds = [m.generic_name.lower() for m in patient.medications]
-
-        for _, criterion in self.start_df.iterrows():
-            # Check if patient meets the condition for this START criterion
-            if self._matches_condition(patient, criterion['condition']):
-                # Check if patient is NOT already on this medication class
-                if not self._already_on_medication(current_meds, criterion['drug_class']):
-                    recommendations.append({
-                        'criterion_id': criterion['criterion_id'],
-                        'system': criterion['system'],
-                        'criterion': criterion['criterion'],
-                        'drug_class': criterion['drug_class'],
-                        'condition': criterion['condition'],
-                        'indication': criterion['indication'],
-                        'recommendation': criterion['recommendation'],
-                        'evidence': criterion['evidence']
-                    })
-
-        return recommendations
-
-    def _matches_drug(self, drug_name: str, drug_class_pattern: str) -> bool:
-        """Check if drug matches the drug class pattern"""
-        drug_lower = drug_name.lower()
-        pattern_lower = drug_class_pattern.lower()
-
-        # Direct substring match
-        if drug_lower in pattern_lower or pattern_lower in drug_lower:
-            return True
-
-        # Common drug class mappings
-        drug_mappings = {
-            'benzodiazepine': ['alprazolam', 'lorazepam', 'diazepam', 'clonazepam', 'temazepam'],
-            'z-drug': ['zolpidem', 'zopiclone', 'eszopiclone'],
-            'nsaid': ['ibuprofen', 'naproxen', 'diclofenac', 'celecoxib', 'meloxicam'],
-            'ppi': ['omeprazole', 'esomeprazole', 'lansoprazole', 'pantoprazole'],
-            'ssri': ['fluoxetine', 'sertraline', 'paroxetine', 'citalopram', 'escitalopram'],
-            'tricyclic': ['amitriptyline', 'nortriptyline', 'imipramine', 'doxepin'],
-            'antihistamine': ['diphenhydramine', 'chlorpheniramine', 'hydroxyzine'],
-            'digoxin': ['digoxin'],
-            'thiazide': ['hydrochlorothiazide', 'chlorthalidone'],
-            'loop diuretic': ['furosemide', 'torsemide', 'bumetanide'],
-            'statin': ['atorvastatin', 'simvastatin', 'rosuvastatin', 'pravastatin'],
-            'anticoagulant': ['warfarin', 'apixaban', 'rivaroxaban', 'dabigatran'],
-            'antiplatelet': ['aspirin', 'clopidogrel'],
-            'acei': ['lisinopril', 'enalapril', 'ramipril'],
-            'arb': ['losartan', 'valsartan', 'irbesartan'],
-            'beta-blocker': ['metoprolol', 'atenolol', 'bisoprolol', 'carvedilol']
-        }
-
-        for drug_class, medications in drug_mappings.items():
-            if drug_class in pattern_lower:
-                if any(med in drug_lower for med in medications):
-                    return True
-            if drug_lower in medications:
-                if drug_class in pattern_lower:
-                    return True
-
-        return False
-
-    def _matches_condition(self, patient: PatientInput, criterion_condition: str) -> bool:
-        """Check if patient meets the condition criteria"""
-        condition_lower = criterion_condition.lower()
-
-        # Check comorbidities
-        for condition in patient.comorbidities:
-            condition_norm = condition.lower().strip()
-            if condition_norm in condition_lower or condition_lower in condition_norm:
-                return True
-
-        # Check age-related conditions
-        if 'age' in condition_lower:
-            if '≥65' in condition_lower or '>= 65' in condition_lower or '>65' in condition_lower:
-                return patient.age >= 65
-            elif '≥85' in condition_lower or '>= 85' in condition_lower:
-                return patient.age >= 85
-
-        # Check for specific blood pressure conditions
-        if 'sbp' in condition_lower or 'systolic' in condition_lower:
-            if '>160' in condition_lower:
-                return True  # Would need actual BP data
-
-        # Check for diabetes
-        if 'diabetes' in condition_lower:
-            return 'Diabetes' in patient.comorbidities or 'diabetes' in [c.lower() for c in patient.comorbidities]
-
-        # Check for hypertension
-        if 'hypertension' in condition_lower:
-            return 'Hypertension' in patient.comorbidities or 'hypertension' in [c.lower() for c in patient.comorbidities]
-
-        # Check for heart conditions
-        if 'heart failure' in condition_lower:
-            return 'Heart failure' in patient.comorbidities or 'heart failure' in [c.lower() for c in patient.comorbidities]
-
-        # Check for dementia
-        if 'dementia' in condition_lower:
-            return 'Dementia' in patient.comorbidities or 'dementia' in [c.lower() for c in patient.comorbidities]
-
-        return False
-
-    def _already_on_medication(self, current_medications: List[str], drug_class: str) -> bool:
-        """Check if patient is already on medication from this class"""
-        for med in current_medications:
-            if self._matches_drug(med, drug_class):
-                return True
-        return False
+        return list(self._start_result(
+            frozenset(m.generic_key for m in patient.medications), _patient_conditions(patient), patient.age
+        ))
+
+    # Results depend only on these fingerprints of the patient: medication
+    # names (in order, repeats included) or the set of lowercased names for
+    # START, normalized comorbidities and age. Flags and matches are shared
+    # between callers and must not be mutated.
+
+    @lru_cache(maxsize=1024)
+    def _stopp_result(self, med_names: Tuple[str, ...], patient_conds: frozenset, age: int) -> Tuple[STOPPFlag, ...]:
+        """STOPP flags for one patient fingerprint (cached; engines are app singletons)"""
+        met = self._stopp_conditions.mask(patient_conds, age)
+        return tuple(self._iter_stopp_flags(med_names, met))
+
+    @lru_cache(maxsize=1024)
+    def _start_result(self, drug_keys: frozenset, patient_conds: frozenset, age: int) -> Tuple[StartCriterionMatch, ...]:
+        """START matches for one patient fingerprint (cached; engines are app singletons)"""
+        met = self._start_conditions.mask(patient_conds, age)
+        return tuple(self._iter_start_matches(drug_keys, met))
+
+    def _iter_stopp_flags(self, med_names: Iterable[str], condition_met: np.ndarray) -> Iterator[STOPPFlag]:
+        """STOPP flags for the named medications, given the criteria whose condition the patient meets"""
+        # Repeated entries of one medication get the same flags again
+        # (as before) without re-running the scan
+        med_flags = {}
+        for name in med_names:
+            if name in med_flags:
+                yield from med_flags[name]
+                continue
+            found = med_flags[name] = []
+            # STOPP criteria matching this drug whose condition the patient meets
+            drug_ids = _drug_match_ids(self._stopp_drugs, _lower(name))
+            for i in drug_ids[condition_met[drug_ids]]:
+                build, rule_id, condition, rationale, full_text = self._stopp_flag_fields[i]
+                flag = build(
+                    rule_id=rule_id,
+                    drug_medication=name,
+                    condition_disease=condition,
+                    rationale=rationale,
+                    full_text=full_text
+                )
+                found.append(flag)
+                yield flag
+
+    def _iter_start_matches(self, drug_keys: Iterable[str], condition_met: np.ndarray) -> Iterator[StartCriterionMatch]:
+        """START matches given the lowercased current medications and the criteria whose condition is met"""
+        # Criteria whose medication class the patient is already on, from the
+        # cached per-drug matches of their current medications
+        already_on = np.zeros_like(condition_met)
+        for drug_lower in drug_keys:
+            already_on[_drug_match_ids(self._start_drugs, drug_lower)] = True
+
+        # Patient meets the condition and is NOT already on this medication class
+        for i in np.flatnonzero(condition_met & ~already_on):
+            yield self._start_matches[i]
@@ -1,12 +1,194 @@
-from typing import List, Dict, Optional
+import logging
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Any, List, Dict, Mapping, Optional
 import pandas as pd
+from pydantic import TypeAdapter
 from app.models.api_models import TaperPlanRequest, TaperPlanResponse, TaperStep
+from app.utils.data_loader import load_beers_data, load_stopp_data
+from app.utils.text import REGEX_SPECIALS
+
+logger = logging.getLogger(__name__)
+
+_TAPER_STEPS_ADAPTER = TypeAdapter(List[TaperStep])
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class _NameIndex:
+    """
+    Searchable column of lowercased names. String names are also joined with
+    newlines into one text, so a literal search is a single str.find; starts
+    holds each joined name's offset and rows its row index. joined is False
+    if there are no names or one contains a newline; every search then takes
+    the regex path.
+    """
+    names: List
+    text: str
+    starts: List[int]
+    rows: List[int]
+    joined: bool
+
+    @classmethod
+    def from_names(cls, names_lower: List) -> '_NameIndex':
+        starts, rows, offset = [], [], 0
+        for row, name in enumerate(names_lower):
+            if isinstance(name, str):
+                starts.append(offset)
+                rows.append(row)
+                offset += len(name) + 1
+        text = '\n'.join(names_lower[row] for row in rows)
+        joined = bool(rows) and text.count('\n') == len(rows) - 1
+        return cls(names=names_lower, text=text, starts=starts, rows=rows, joined=joined)
+
+    def first_match(self, pattern: str) -> Optional[int]:
+        """
+        Index of the first name the pattern is found in, or None; same test as
+        Series.str.contains(pattern, na=False) (a regex search, non-strings skipped)
+        """
+        if self.joined and REGEX_SPECIALS.isdisjoint(pattern):
+            # Literal pattern: the first hit in the joined text is the first row
+            position = self.text.find(pattern)
+            return None if position < 0 else self.rows[bisect_right(self.starts, position) - 1]
+
+        search = re.compile(pattern).search
+        for i, name in enumerate(self.names):
+            if isinstance(name, str) and search(name):
+                return i
+        return None
+
+
+# Static fallback plans, validated once at import. Per-request copies only
+# patch in the drug name and share the (frozen) steps and criteria.
+_SAFE_DISCONTINUATION_PLAN = TaperPlanResponse(
+    drug_name="",
+    drug_class="Not classified as high-risk",
+    risk_profile="Standard",
+    taper_strategy="Safe discontinuation",
+    total_duration_weeks=1,
+    steps=[
+        TaperStep(
+            week=1,
+            dose="Current dose",
+            percentage_of_original=100,
+            instructions="{drug_name} is not classified as high-risk for withdrawal. May be discontinued with medical supervision.",
+            monitoring="Monitor for return of symptoms being treated",
+            withdrawal_symptoms_to_watch=["Return of original symptoms"]
+        ),
+        TaperStep(
+            week=2,
+            dose="STOP",
+            percentage_of_original=0,
+            instructions="Medication discontinued. Continue monitoring.",
+            monitoring="Follow up with healthcare provider in 2-4 weeks",
+            withdrawal_symptoms_to_watch=["Any new symptoms"]
+        )
+    ],
+    pause_criteria=["Return of symptoms"],
+    reversal_criteria=["Medical necessity"],
+    monitoring_schedule={
+        "Week 1-2": ["Monitor for return of original symptoms"],
+        "Week 3-4": ["Follow-up assessment with healthcare provider"]
+    },
+    patient_education=[
+        "{drug_name} was not identified in high-risk medication lists",
+        "It can likely be stopped safely with monitoring",
+        "Always inform your healthcare provider before stopping any medication",
+        "Report any concerning symptoms immediately"
+    ]
+)
+
+_GENERIC_TAPER_PLAN = TaperPlanResponse(
+    drug_name="",
+    drug_class="Unknown",
+    risk_profile="Standard",
+    taper_strategy="Generic Gradual Reduction",
+    total_duration_weeks=8,
+    steps=[
+        TaperStep(
+            week=1,
+            dose="75% of current dose",
+            percentage_of_original=75,
+            instructions="Reduce dose by 25%",
+            monitoring="Weekly assessment",
+            withdrawal_symptoms_to_watch=["General discomfort", "Return of symptoms"]
+        ),
+        TaperStep(
+            week=4,
+            dose="50% of current dose",
+            percentage_of_original=50,
+            instructions="Reduce dose by another 25%",
+            monitoring="Bi-weekly assessment",
+            withdrawal_symptoms_to_watch=["Monitor closely for symptoms"]
+        ),
+        TaperStep(
+            week=6,
+            dose="25% of current dose",
+            percentage_of_original=25,
+            instructions="Reduce to 25% of original dose",
+            monitoring="Weekly assessment",
+            withdrawal_symptoms_to_watch=["Watch for withdrawal"]
+        ),
+        TaperStep(
+            week=8,
+            dose="STOP",
+            percentage_of_original=0,
+            instructions="Discontinue medication. Monitor for 4 weeks.",
+            monitoring="Weekly monitoring",
+            withdrawal_symptoms_to_watch=["Any new symptoms"]
+        )
+    ],
+    pause_criteria=["Severe symptoms", "Patient distress", "Safety concerns"],
+    reversal_criteria=["Unmanageable symptoms", "Medical necessity"],
+    monitoring_schedule={"General": ["Weekly check-ins for 8 weeks", "Daily symptom diary"]},
+    patient_education=["Gradual tapering is recommended", "Consult your doctor before making changes"]
+)
+
+_EMERGENCY_FALLBACK_PLAN = TaperPlanResponse(
+    drug_name="",
+    drug_class="Unknown",
+    risk_profile="Requires clinical assessment",
+    taper_strategy="Consult healthcare provider",
+    total_duration_weeks=4,
+    steps=[
+        TaperStep(
+            week=1,
+            dose="Current dose",
+            percentage_of_original=100,
+            instructions="Maintain current dose. Schedule appointment with healthcare provider.",
+            monitoring="Daily self-monitoring",
+            withdrawal_symptoms_to_watch=["Any changes"]
+        )
+    ],
+    pause_criteria=["Any concerning symptoms"],
+    reversal_criteria=["Medical advice"],
+    monitoring_schedule={"Immediate": ["Contact healthcare provider for personalized plan"]},
+    patient_education=["This medication requires individualized tapering guidance from your healthcare provider"]
+)
+
 
 class TaperPlanService:
+    # High-risk drug classes (case-sensitive, like the substring tests it replaces)
+    _HIGH_RISK_RE = re.compile('|'.join(map(re.escape, (
+        'Benzodiazepine', 'Anticholinergic', 'Antidepressant',
+        'Antipsychotic', 'Opioid', 'Sedative'
+    ))))
+    
     def __init__(self, tapering_df: pd.DataFrame, cfs_df: pd.DataFrame, gemini_api_key: str = None):
         self.tapering_df = tapering_df
         self.cfs_df = cfs_df
-        self.tapering_df['drug_name'] = self.tapering_df['drug_name'].str.lower()
+        
+        # Static tables indexed once: first row per lowercased drug name / CFS
+        # score, so lookups are a dict get instead of a DataFrame mask per
+        # request. The caller's frame is left untouched.
+        self._taper_index = {}
+        for name_lower, record in zip(self.tapering_df['drug_name'].str.lower(),
+                                      self.tapering_df.to_dict('records')):
+            self._taper_index.setdefault(name_lower, record)
+        self._cfs_index = {}
+        for score, multiplier in zip(self.cfs_df['cfs_score'], self.cfs_df['taper_speed_multiplier']):
+            self._cfs_index.setdefault(score, multiplier)
         
         # Initialize Gemini service with error handling
         self.use_gemini = False
@@ -17,131 +199,174 @@ class TaperPlanService:
                 from app.services.gemini_service import GeminiTaperService
                 self.gemini_service = GeminiTaperService(api_key=gemini_api_key)
                 self.use_gemini = True
-                print("✅ Gemini API initialized for taper schedule generation")
+                logger.info("✅ Gemini API initialized for taper schedule generation")
             except ImportError as e:
-                print(f"⚠️ Gemini service not available: {e}")
-                print("   Install with: pip install google-generativeai")
+                logger.warning("⚠️ Gemini service not available: %s (install with: pip install google-generativeai)", e)
                 self.use_gemini = False
             except Exception as e:
-                print(f"⚠️ Gemini initialization failed: {e}")
+                logger.warning("⚠️ Gemini initialization failed: %s", e)
                 self.use_gemini = False
         else:
-            print("ℹ️  No Gemini API key provided. Using basic taper schedules.")
+            logger.info("ℹ️  No Gemini API key provided. Using basic taper schedules.")
     
     def get_taper_plan(self, request: TaperPlanRequest) -> TaperPlanResponse:
         """Generate detailed taper plan (with proper logic)"""
-        
         try:
-            drug_lower = request.drug_name.lower()
-            
-            # ===== STEP 1: Check tapering_rules_dataset.csv (10 drugs) =====
-            match = self.tapering_df[self.tapering_df['drug_name'] == drug_lower]
-            
-            if not match.empty:
-                print(f"✅ Found {request.drug_name} in tapering database (one of the 10)")
-                row = match.iloc[0]
-                # Continue with existing logic...
-                return self._generate_plan_from_row(row, request)
-            
-            # ===== STEP 2: Drug NOT in 10 - Check Beers/STOPP =====
-            print(f"⚠️  Drug '{request.drug_name}' not in tapering database")
-            print(f"🔍 Checking if it's in Beers or STOPP criteria...")
-            
-            # Check Beers Criteria
-            beers_info = self._check_beers_for_drug(request.drug_name)
+            if self.use_gemini:
+                # Gemini answers can differ between calls; only local plans are memoized
+                return self._build_taper_plan(request)
+            return self._cached_taper_plan(
+                request.drug_name, request.current_dose, request.duration_on_medication,
+                request.patient_cfs_score, request.patient_age, tuple(request.comorbidities)
+            )
+        except Exception as e:
+            # Outside the cache, so a transient failure is retried on the next call
+            logger.exception("❌ Error in get_taper_plan: %s", e)
+            return self._emergency_fallback_plan(request)
+    
+    @lru_cache(maxsize=1024)
+    def _cached_taper_plan(self, drug_name: str, current_dose: str, duration_on_medication: str,
+                           patient_cfs_score: Optional[int], patient_age: int,
+                           comorbidities: tuple) -> TaperPlanResponse:
+        """
+        Local (non-Gemini) plan per request fields (cached; services are app
+        singletons). The frozen response is shared between callers;
+        _cached_taper_plan.cache_clear() drops all entries. Errors propagate,
+        so only successfully built plans are cached.
+        """
+        return self._build_taper_plan(TaperPlanRequest.model_construct(
+            drug_name=drug_name,
+            current_dose=current_dose,
+            duration_on_medication=duration_on_medication,
+            patient_cfs_score=patient_cfs_score,
+            patient_age=patient_age,
+            comorbidities=list(comorbidities)
+        ))
+    
+    def _build_taper_plan(self, request: TaperPlanRequest) -> TaperPlanResponse:
+        """Taper plan for a request: database row, Beers/STOPP context, or fallback"""
+        
+        drug_lower = request.drug_name.lower()
+        
+        # ===== STEP 1: Check tapering_rules_dataset.csv (10 drugs) =====
+        row = self._taper_index.get(drug_lower)
+        
+        if row is not None:
+            logger.info("✅ Found %s in tapering database (one of the 10)", request.drug_name)
+            # Continue with existing logic...
+            return self._generate_plan_from_row(row, request)
+        
+        # ===== STEP 2: Drug NOT in 10 - Check Beers/STOPP =====
+        logger.info("⚠️  Drug '%s' not in tapering database", request.drug_name)
+        logger.debug("🔍 Checking if it's in Beers or STOPP criteria...")
+        
+        # Check Beers and STOPP Criteria
+        beers_info, stopp_info = self._lookup_criteria(drug_lower)
+        
+        # ===== STEP 3: Decide if tapering is needed =====
+        if beers_info or stopp_info:
+            logger.info("✅ %s found in clinical criteria", request.drug_name)
             
-            # Check STOPP Criteria  
-            stopp_info = self._check_stopp_for_drug(request.drug_name)
+            if beers_info:
+                logger.debug("   Beers: %s", beers_info.get('rationale', 'N/A'))
+            if stopp_info:
+                logger.debug("   STOPP: %s", stopp_info.get('criterion', 'N/A'))
             
-            # ===== STEP 3: Decide if tapering is needed =====
-            if beers_info or stopp_info:
-                print(f"✅ {request.drug_name} found in clinical criteria")
-                
-                if beers_info:
-                    print(f"   Beers: {beers_info.get('rationale', 'N/A')}")
-                if stopp_info:
-                    print(f"   STOPP: {stopp_info.get('criterion', 'N/A')}")
-                
-                # Use Gemini to generate taper plan with context
-                if self.use_gemini and self.gemini_service:
-                    return self._generate_plan_with_gemini_context(
-                        request, 
-                        beers_info, 
-                        stopp_info
-                    )
-                else:
-                    # Fallback: Clinical criteria taper
-                    return self._generate_clinical_criteria_taper(
-                        request,
-                        beers_info,
-                        stopp_info
-                    )
+            # Use Gemini to generate taper plan with context
+            if self.use_gemini and self.gemini_service:
+                return self._generate_plan_with_gemini_context(
+                    request, 
+                    beers_info, 
+                    stopp_info
+                )
             else:
-                print(f"⚠️  {request.drug_name} not in Beers/STOPP")
-                print(f"   Likely safe to discontinue with monitoring")
-                return self._generate_safe_discontinuation_plan(request)
-        
-        except Exception as e:
-            print(f"❌ Error in get_taper_plan: {e}")
-            import traceback
-            traceback.print_exc()
-            return self._emergency_fallback_plan(request)
+                # Fallback: Clinical criteria taper
+                return self._generate_clinical_criteria_taper(
+                    request,
+                    beers_info,
+                    stopp_info
+                )
+        else:
+            logger.info("⚠️  %s not in Beers/STOPP; likely safe to discontinue with monitoring", request.drug_name)
+            return self._generate_safe_discontinuation_plan(request)
 
 # ===== NEW HELPER METHODS =====
 
-    def _check_beers_for_drug(self, drug_name: str):
-        """Check if drug is in Beers Criteria"""
+    @cached_property
+    def _beers_rows(self) -> tuple:
+        """Beers info dicts and the lowercased drug name index (built on first use)"""
+        beers_df = load_beers_data()
+        infos = [
+            {
+                'table': row.get('table', 'Unknown'),
+                'therapeutic_category': row.get('therapeutic_category', 'Unknown'),
+                'rationale': row.get('rationale', 'Potentially inappropriate'),
+                'recommendation': row.get('recommendation', 'Avoid'),
+                'quality': row.get('quality', 'Unknown'),
+                'strength': row.get('strength', 'Unknown')
+            }
+            for row in beers_df.to_dict('records')
+        ]
+        return infos, _NameIndex.from_names(beers_df['drug_name'].str.lower().tolist())
+
+    @cached_property
+    def _stopp_rows(self) -> tuple:
+        """STOPP info dicts and the lowercased drug class index (built on first use)"""
+        stopp_df = load_stopp_data()
+        infos = [
+            {
+                'criterion_id': row.get('criterion_id', 'Unknown'),
+                'system': row.get('system', 'Unknown'),
+                'criterion': row.get('criterion', 'Potentially inappropriate'),
+                'action': row.get('action', 'Review'),
+                'condition': row.get('condition', 'N/A')
+            }
+            for row in stopp_df.to_dict('records')
+        ]
+        return infos, _NameIndex.from_names(stopp_df['drug_class'].str.lower().tolist())
+
+    @lru_cache(maxsize=1024)
+    def _beers_match(self, drug_lower: str) -> Optional[int]:
+        """First Beers row matching the drug (cached; services are app singletons)"""
+        return self._beers_rows[1].first_match(drug_lower)
+
+    @lru_cache(maxsize=1024)
+    def _stopp_match(self, drug_lower: str) -> Optional[int]:
+        """First STOPP row matching the drug (cached; services are app singletons)"""
+        return self._stopp_rows[1].first_match(drug_lower)
+
+    def _lookup_criteria(self, drug_lower: str) -> tuple:
+        """(beers_info, stopp_info) for an already lowercased drug name"""
+        return self._check_beers_for_drug(drug_lower), self._check_stopp_for_drug(drug_lower)
+
+    def _check_beers_for_drug(self, drug_lower: str):
+        """Check if drug (lowercased) is in Beers Criteria"""
+        # Loaded outside the try: a failed load propagates to get_taper_plan,
+        # whose fallback is not cached
+        infos = self._beers_rows[0]
         try:
-            from app.utils.data_loader import load_beers_data
-            beers_df = load_beers_data()
-            
             # Search in drug_name column (case-insensitive)
-            drug_lower = drug_name.lower()
-            matches = beers_df[beers_df['drug_name'].str.lower().str.contains(drug_lower, na=False)]
-            
-            if not matches.empty:
-                row = matches.iloc[0]
-                return {
-                    'table': row.get('table', 'Unknown'),
-                    'therapeutic_category': row.get('therapeutic_category', 'Unknown'),
-                    'rationale': row.get('rationale', 'Potentially inappropriate'),
-                    'recommendation': row.get('recommendation', 'Avoid'),
-                    'quality': row.get('quality', 'Unknown'),
-                    'strength': row.get('strength', 'Unknown')
-                }
-            return None
+            index = self._beers_match(drug_lower)
+            return None if index is None else dict(infos[index])
         except Exception as e:
-            print(f"   Error checking Beers: {e}")
+            logger.warning("   Error checking Beers: %s", e)
             return None
 
-    def _check_stopp_for_drug(self, drug_name: str):
-        """Check if drug is in STOPP Criteria"""
+    def _check_stopp_for_drug(self, drug_lower: str):
+        """Check if drug (lowercased) is in STOPP Criteria"""
+        infos = self._stopp_rows[0]  # a failed load propagates, as for Beers
         try:
-            from app.utils.data_loader import load_stopp_data
-            stopp_df = load_stopp_data()
-            
             # Search in drug/class column
-            drug_lower = drug_name.lower()
-            matches = stopp_df[stopp_df['drug_class'].str.lower().str.contains(drug_lower, na=False)]
-            
-            if not matches.empty:
-                row = matches.iloc[0]
-                return {
-                    'criterion_id': row.get('criterion_id', 'Unknown'),
-                    'system': row.get('system', 'Unknown'),
-                    'criterion': row.get('criterion', 'Potentially inappropriate'),
-                    'action': row.get('action', 'Review'),
-                    'condition': row.get('condition', 'N/A')
-                }
-            return None
+            index = self._stopp_match(drug_lower)
+            return None if index is None else dict(infos[index])
         except Exception as e:
-            print(f"   Error checking STOPP: {e}")
+            logger.warning("   Error checking STOPP: %s", e)
             return None
 
     def _generate_plan_with_gemini_context(self, request, beers_info, stopp_info):
         """Use Gemini with clinical context from Beers/STOPP"""
         
-        print(f"🤖 Using Gemini to generate taper plan with clinical context...")
+        logger.info("🤖 Using Gemini to generate taper plan with clinical context...")
         
         # Build context string
         context = f"Drug: {request.drug_name}\n"
@@ -170,11 +395,11 @@ class TaperPlanService:
             
             # Check if tapering is needed
             if not drug_info.get('requires_taper', True):
-                print(f"ℹ️  {request.drug_name} does not require tapering per Gemini analysis")
+                logger.info("ℹ️  %s does not require tapering per Gemini analysis", request.drug_name)
                 return self._no_taper_needed_plan(request, drug_info)
             
-            # Create synthetic row for taper generation
-            row = pd.Series({
+            # Create synthetic row for taper generation (a plain dict, like database rows)
+            row = {
                 'drug_name': request.drug_name,
                 'drug_class': drug_info.get('drug_class', 'Unknown'),
                 'risk_profile': drug_info.get('risk_profile', 'Standard'),
@@ -184,17 +409,15 @@ class TaperPlanService:
                 'monitoring_frequency': drug_info.get('monitoring_frequency', 'Weekly'),
                 'pause_criteria': drug_info.get('pause_criteria', 'Severe symptoms'),
                 'base_taper_duration_weeks': drug_info.get('typical_duration_weeks', 4)
-            })
+            }
             
-            print(f"✅ Gemini-generated profile: {row['drug_class']}, Risk: {row['risk_profile']}")
+            logger.info("✅ Gemini-generated profile: %s, Risk: %s", row['drug_class'], row['risk_profile'])
             
             # Continue with normal taper generation
             return self._generate_plan_from_row(row, request)
             
         except Exception as e:
-            print(f"❌ Gemini generation failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Gemini generation failed: %s", e)
             return self._generate_clinical_criteria_taper(request, beers_info, stopp_info)
 
     def _generate_clinical_criteria_taper(self, request, beers_info, stopp_info):
@@ -209,12 +432,7 @@ class TaperPlanService:
             drug_class = "Unknown"
         
         # Simple classification
-        high_risk_classes = [
-            'Benzodiazepine', 'Anticholinergic', 'Antidepressant', 
-            'Antipsychotic', 'Opioid', 'Sedative'
-        ]
-        
-        requires_slow_taper = any(risk in drug_class for risk in high_risk_classes)
+        requires_slow_taper = self._HIGH_RISK_RE.search(drug_class) is not None
         
         if requires_slow_taper:
             duration = 8
@@ -254,47 +472,21 @@ class TaperPlanService:
 
     def _generate_safe_discontinuation_plan(self, request):
         """For drugs NOT in Beers/STOPP - likely safe to stop"""
-    
-        return TaperPlanResponse(
-            drug_name=request.drug_name,
-            drug_class="Not classified as high-risk",
-            risk_profile="Standard",
-            taper_strategy="Safe discontinuation",
-            total_duration_weeks=1,
-            steps=[
-                TaperStep(
-                    week=1,
-                    dose="Current dose",
-                    percentage_of_original=100,
-                    instructions=f"{request.drug_name} is not classified as high-risk for withdrawal. May be discontinued with medical supervision.",
-                    monitoring="Monitor for return of symptoms being treated",
-                    withdrawal_symptoms_to_watch=["Return of original symptoms"]
-                ),
-                TaperStep(
-                    week=2,
-                    dose="STOP",
-                    percentage_of_original=0,
-                    instructions="Medication discontinued. Continue monitoring.",
-                    monitoring="Follow up with healthcare provider in 2-4 weeks",
-                    withdrawal_symptoms_to_watch=["Any new symptoms"]
-                )
-            ],
-            pause_criteria=["Return of symptoms"],
-            reversal_criteria=["Medical necessity"],
-            monitoring_schedule={
-                "Week 1-2": ["Monitor for return of original symptoms"],
-                "Week 3-4": ["Follow-up assessment with healthcare provider"]
-            },
-            patient_education=[
-                f"{request.drug_name} was not identified in high-risk medication lists",
-                "It can likely be stopped safely with monitoring",
-                "Always inform your healthcare provider before stopping any medication",
-                "Report any concerning symptoms immediately"
-            ]
-        )
-
-    
-
+        template = _SAFE_DISCONTINUATION_PLAN
+        first_step = template.steps[0]
+        return template.model_copy(update={
+            'drug_name': request.drug_name,
+            'steps': (
+                first_step.model_copy(update={
+                    'instructions': first_step.instructions.format(drug_name=request.drug_name)
+                }),
+                *template.steps[1:]
+            ),
+            'patient_education': (
+                template.patient_education[0].format(drug_name=request.drug_name),
+                *template.patient_education[1:]
+            )
+        })
 
     def _no_taper_needed_plan(self, request: TaperPlanRequest, drug_info: Dict) -> TaperPlanResponse:
         """Return a plan indicating no taper is needed"""
@@ -340,26 +532,24 @@ class TaperPlanService:
         num_steps = max(4, duration // 2)
         reduction_per_step = 100 // num_steps
         
-        steps = []
-        for i in range(num_steps):
-            current_percentage = 100 - (reduction_per_step * i)
-            week = (i * (duration // num_steps)) + 1
-            
-            if current_percentage <= 0:
-                dose_str = "STOP"
-                instructions = "Discontinue medication. Monitor for withdrawal symptoms for 4 weeks."
-            else:
-                dose_str = f"{current_percentage}% of {current_dose}"
-                instructions = f"Reduce to {current_percentage}% of starting dose ({current_dose})"
-            
-            steps.append(TaperStep(
-                week=week,
-                dose=dose_str,
-                percentage_of_original=max(0, current_percentage),
-                instructions=instructions,
+        step_weeks = duration // num_steps
+        symptom_list = symptoms.split(',') if symptoms else None
+        symptoms_to_watch = symptom_list[:3] if symptom_list else ["General discomfort"]
+        
+        steps = [
+            TaperStep(
+                week=(i * step_weeks) + 1,
+                dose="STOP" if pct <= 0 else f"{pct}% of {current_dose}",
+                percentage_of_original=max(0, pct),
+                instructions=(
+                    "Discontinue medication. Monitor for withdrawal symptoms for 4 weeks." if pct <= 0
+                    else f"Reduce to {pct}% of starting dose ({current_dose})"
+                ),
                 monitoring="Check-in with healthcare provider" if i % 2 == 0 else "Self-monitoring",
-                withdrawal_symptoms_to_watch=symptoms.split(',')[:3] if symptoms else ["General discomfort"]
-            ))
+                withdrawal_symptoms_to_watch=symptoms_to_watch
+            )
+            for i, pct in ((i, 100 - (reduction_per_step * i)) for i in range(num_steps))
+        ]
         
         # Add final STOP step if not already there
         if steps[-1].percentage_of_original > 0:
@@ -369,7 +559,7 @@ class TaperPlanService:
                 percentage_of_original=0,
                 instructions="Complete discontinuation. Continue monitoring for 4 weeks.",
                 monitoring="Weekly assessment for 4 weeks",
-                withdrawal_symptoms_to_watch=symptoms.split(',') if symptoms else ["Return of symptoms"]
+                withdrawal_symptoms_to_watch=symptom_list or ["Return of symptoms"]
             ))
         
         return steps
@@ -415,115 +605,26 @@ class TaperPlanService:
     
     def _generic_taper_plan(self, request: TaperPlanRequest) -> TaperPlanResponse:
         """Generic plan for unknown drugs"""
-        return TaperPlanResponse(
-            drug_name=request.drug_name,
-            drug_class="Unknown",
-            risk_profile="Standard",
-            taper_strategy="Generic Gradual Reduction",
-            total_duration_weeks=8,
-            steps=[
-                TaperStep(
-                    week=1,
-                    dose="75% of current dose",
-                    percentage_of_original=75,
-                    instructions="Reduce dose by 25%",
-                    monitoring="Weekly assessment",
-                    withdrawal_symptoms_to_watch=["General discomfort", "Return of symptoms"]
-                ),
-                TaperStep(
-                    week=4,
-                    dose="50% of current dose",
-                    percentage_of_original=50,
-                    instructions="Reduce dose by another 25%",
-                    monitoring="Bi-weekly assessment",
-                    withdrawal_symptoms_to_watch=["Monitor closely for symptoms"]
-                ),
-                TaperStep(
-                    week=6,
-                    dose="25% of current dose",
-                    percentage_of_original=25,
-                    instructions="Reduce to 25% of original dose",
-                    monitoring="Weekly assessment",
-                    withdrawal_symptoms_to_watch=["Watch for withdrawal"]
-                ),
-                TaperStep(
-                    week=8,
-                    dose="STOP",
-                    percentage_of_original=0,
-                    instructions="Discontinue medication. Monitor for 4 weeks.",
-                    monitoring="Weekly monitoring",
-                    withdrawal_symptoms_to_watch=["Any new symptoms"]
-                )
-            ],
-            pause_criteria=["Severe symptoms", "Patient distress", "Safety concerns"],
-            reversal_criteria=["Unmanageable symptoms", "Medical necessity"],
-            monitoring_schedule={"General": ["Weekly check-ins for 8 weeks", "Daily symptom diary"]},
-            patient_education=["Gradual tapering is recommended", "Consult your doctor before making changes"]
-        )
+        return _GENERIC_TAPER_PLAN.model_copy(update={'drug_name': request.drug_name})
     
     def _emergency_fallback_plan(self, request: TaperPlanRequest) -> TaperPlanResponse:
         """Last resort if everything fails"""
-        return TaperPlanResponse(
-            drug_name=request.drug_name,
-            drug_class="Unknown",
-            risk_profile="Requires clinical assessment",
-            taper_strategy="Consult healthcare provider",
-            total_duration_weeks=4,
-            steps=[
-                TaperStep(
-                    week=1,
-                    dose="Current dose",
-                    percentage_of_original=100,
-                    instructions="Maintain current dose. Schedule appointment with healthcare provider.",
-                    monitoring="Daily self-monitoring",
-                    withdrawal_symptoms_to_watch=["Any changes"]
-                )
-            ],
-            pause_criteria=["Any concerning symptoms"],
-            reversal_criteria=["Medical advice"],
-            monitoring_schedule={"Immediate": ["Contact healthcare provider for personalized plan"]},
-            patient_education=["This medication requires individualized tapering guidance from your healthcare provider"]
-        )
-    def _no_taper_needed_plan(self, request: TaperPlanRequest, drug_info: Dict) -> TaperPlanResponse:
-        """Return a plan indicating no taper is needed"""
-        return TaperPlanResponse(
-            drug_name=request.drug_name,
-            drug_class=drug_info.get('drug_class', 'Unknown'),
-            risk_profile=drug_info.get('risk_profile', 'Low-risk'),
-            taper_strategy="No Taper Required",
-            total_duration_weeks=0,
-            steps=[
-                TaperStep(
-                    week=1,
-                    dose="Can be discontinued",
-                    percentage_of_original=0,
-                    instructions=f"{request.drug_name} can typically be stopped without tapering. However, consult your healthcare provider before making any changes.",
-                    monitoring="Monitor for return of symptoms",
-                    withdrawal_symptoms_to_watch=drug_info.get('withdrawal_symptoms', 'Return of symptoms').split(',')[:3]
-                )
-            ],
-            pause_criteria=["Return of severe symptoms"],
-            reversal_criteria=["Symptoms worsen significantly"],
-            monitoring_schedule={
-                "First 2 weeks": ["Monitor for return of original symptoms"],
-                "Ongoing": ["Follow up with healthcare provider if concerns arise"]
-            },
-            patient_education=[
-                f"{request.drug_name} typically does not require gradual tapering.",
-                "Always inform your doctor before stopping any medication.",
-                drug_info.get('special_considerations', 'Monitor as directed.')
-            ]
-        )
-    def _generate_plan_from_row(self, row, request: TaperPlanRequest) -> TaperPlanResponse:
-        """Generate plan from database row (for the 10 drugs in CSV)"""
+        return _EMERGENCY_FALLBACK_PLAN.model_copy(update={'drug_name': request.drug_name})
+    
+    @staticmethod
+    def _with_int_week(step_dict: Dict) -> Dict:
+        """Gemini step with a week range such as '3-4' reduced to its first week"""
+        week = step_dict.get('week')
+        if isinstance(week, str):
+            return {**step_dict, 'week': int(week.split('-')[0].strip())}
+        return step_dict
+    
+    def _generate_plan_from_row(self, row: Mapping[str, Any], request: TaperPlanRequest) -> TaperPlanResponse:
+        """Generate plan from database row (for the 10 drugs in CSV) or a synthetic row dict"""
         
         # Get frailty adjustment
-        taper_multiplier = 1.0
-        if request.patient_cfs_score:
-            cfs_row = self.cfs_df[self.cfs_df['cfs_score'] == request.patient_cfs_score]
-            if not cfs_row.empty:
-                taper_multiplier = cfs_row.iloc[0]['taper_speed_multiplier']
-                print(f"   CFS {request.patient_cfs_score}: Taper multiplier = {taper_multiplier}")
+        taper_multiplier = self._cfs_index.get(request.patient_cfs_score, 1.0) if request.patient_cfs_score else 1.0
+        logger.debug("   CFS %s: Taper multiplier = %s", request.patient_cfs_score, taper_multiplier)
         
         # Calculate duration
         base_duration = int(row.get('base_taper_duration_weeks', 8))
@@ -533,7 +634,7 @@ class TaperPlanService:
             base_duration = max(base_duration // 2, 4)
             
         adjusted_duration = int(base_duration / taper_multiplier)
-        print(f"   Duration: {base_duration} weeks → {adjusted_duration} weeks (frailty-adjusted)")
+        logger.debug("   Duration: %s weeks → %s weeks (frailty-adjusted)", base_duration, adjusted_duration)
         
         # Generate steps - TRY Gemini first for detailed schedule
         steps = []
@@ -543,7 +644,7 @@ class TaperPlanService:
         
         if self.use_gemini and self.gemini_service:
             try:
-                print(f"🤖 Generating detailed AI taper schedule...")
+                logger.info("🤖 Generating detailed AI taper schedule...")
                 gemini_schedule = self.gemini_service.generate_detailed_taper_schedule(
                     drug_name=request.drug_name,
                     drug_class=row['drug_class'],
@@ -560,33 +661,35 @@ class TaperPlanService:
                 
                 # Validate and convert steps
                 if gemini_schedule and 'taper_steps' in gemini_schedule:
-                    validated_steps = []
-                    for step_dict in gemini_schedule.get('taper_steps', []):
-                        try:
-                            # Ensure week is integer
-                            if isinstance(step_dict.get('week'), str):
-                                week_str = step_dict['week'].split('-')[0].strip()
-                                step_dict['week'] = int(week_str)
-                            
-                            validated_steps.append(TaperStep(**step_dict))
-                        except Exception as e:
-                            print(f"⚠️  Skipping invalid step: {e}")
-                            continue
+                    raw_steps = gemini_schedule.get('taper_steps', [])
+                    try:
+                        # One validation pass for the usual all-valid schedule
+                        validated_steps = _TAPER_STEPS_ADAPTER.validate_python(
+                            [self._with_int_week(step_dict) for step_dict in raw_steps]
+                        )
+                    except Exception:
+                        # Otherwise validate step by step, skipping the invalid ones
+                        validated_steps = []
+                        for step_dict in raw_steps:
+                            try:
+                                validated_steps.append(TaperStep(**self._with_int_week(step_dict)))
+                            except Exception as e:
+                                logger.warning("⚠️  Skipping invalid step: %s", e)
+                                continue
                     
                     steps = validated_steps
                     patient_education = gemini_schedule.get('patient_education', [])
                     pause_criteria = gemini_schedule.get('pause_criteria', [])
                     reversal_criteria = gemini_schedule.get('success_indicators', [])
                     
-                    print(f"✅ AI generated {len(steps)} taper steps")
+                    logger.info("✅ AI generated %d taper steps", len(steps))
                 
             except Exception as e:
-                print(f"⚠️  Gemini schedule generation failed: {e}")
-                print("🔄 Using basic taper generation")
+                logger.warning("⚠️  Gemini schedule generation failed: %s; using basic taper generation", e)
         
         # Fallback to basic generation if needed
         if not steps:
-            print(f"📋 Generating basic taper plan")
+            logger.debug("📋 Generating basic taper plan")
             steps = self._generate_basic_steps(
                 row['step_logic'],
                 row['withdrawal_symptoms'],
@@ -1,47 +1,68 @@
+from functools import lru_cache
 import pandas as pd
 from app.models.patient import PatientInput, DurationCategory
 from app.models.responses import TaperPlan
 
 class TaperingEngine:
+    __slots__ = ('tapering_df', 'cfs_map_df', '_rules', '_cfs')
+    
     def __init__(self, tapering_df: pd.DataFrame, cfs_map_df: pd.DataFrame):
         self.tapering_df = tapering_df
         self.cfs_map_df = cfs_map_df
+        
+        # First rule per lowercased drug name and first (multiplier, guidance)
+        # per CFS score, so each lookup is a dict get instead of a frame mask
+        self._rules = {}
+        for name_lower, record in zip(self.tapering_df['drug_name'].str.lower(),
+                                      self.tapering_df.to_dict('records')):
+            if isinstance(name_lower, str):
+                self._rules.setdefault(name_lower, record)
+        self._cfs = {}
+        for score, multiplier, guidance in zip(self.cfs_map_df['cfs_score'].tolist(),
+                                               self.cfs_map_df['taper_speed_multiplier'].to_numpy(),
+                                               self.cfs_map_df['clinical_guidance']):
+            self._cfs.setdefault(score, (multiplier, guidance))
     
     def generate_taper_plans(self, patient: PatientInput) -> list[TaperPlan]:
+        cfs_score = patient.cfs_score if patient.cfs_score else (5 if patient.is_frail else 2)
+        return list(self._taper_plans(
+            tuple((med.generic_name, med.duration) for med in patient.medications), cfs_score
+        ))
+    
+    @lru_cache(maxsize=1024)
+    def _taper_plans(self, medications: tuple, cfs_score: int) -> tuple[TaperPlan, ...]:
+        """
+        Plans per (generic name, duration) list and CFS score (cached; engines
+        are app singletons). Plans are shared between callers.
+        """
         plans = []
         
         # Get frailty adjustment
-        cfs_score = patient.cfs_score if patient.cfs_score else (5 if patient.is_frail else 2)
-        frailty_data = self.cfs_map_df[self.cfs_map_df['cfs_score'] == cfs_score].iloc[0]
-        taper_multiplier = frailty_data['taper_speed_multiplier']
+        taper_multiplier, clinical_guidance = self._cfs[cfs_score]
         
-        for med in patient.medications:
-            drug_lower = med.generic_name.lower()
+        for generic_name, duration in medications:
+            drug_lower = generic_name.lower()
             
             # Match drug in tapering rules
-            match = self.tapering_df[
-                self.tapering_df['drug_name'].str.lower() == drug_lower
-            ]
+            row = self._rules.get(drug_lower)
             
-            if not match.empty:
-                row = match.iloc[0]
-                
+            if row is not None:
                 # Adjust duration based on frailty
                 base_duration_weeks = 4  # Default
-                if med.duration == DurationCategory.LONG_TERM:
+                if duration == DurationCategory.LONG_TERM:
                     base_duration_weeks = 8
                 
                 adjusted_duration = int(base_duration_weeks / taper_multiplier)
                 
                 plans.append(TaperPlan(
-                    drug_name=med.generic_name,
+                    drug_name=generic_name,
                     taper_strategy=row['taper_strategy_name'],
                     step_logic=row['step_logic'],
                     adjusted_duration_weeks=adjusted_duration,
                     monitoring_frequency=row['monitoring_frequency'],
                     withdrawal_symptoms=row['withdrawal_symptoms'],
                     pause_criteria=row['pause_criteria'],
-                    frailty_adjustment=f"CFS {cfs_score}: {frailty_data['clinical_guidance']}"
+                    frailty_adjustment=f"CFS {cfs_score}: {clinical_guidance}"
                 ))
         
-        return plans
+        return tuple(plans)
@@ -1,65 +1,131 @@
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from app.models.patient import PatientInput, LifeExpectancyCategory
 from app.models.responses import TimeToBenefit, RiskCategory
+from app.utils.text import REGEX_SPECIALS
 from typing import List
 
+# assess_time_to_benefit recommendation kinds, in the order they are tested
+_REC_NO_BENEFIT, _REC_LE_TOO_SHORT, _REC_MARGINAL, _REC_CONTINUE = range(4)
+_REC_TEXT = {
+    _REC_NO_BENEFIT: "DEPRESCRIBE - No proven benefit or harm > benefit",
+    _REC_MARGINAL: "CONSIDER DEPRESCRIBING - Marginal benefit window",
+    _REC_CONTINUE: "CONTINUE - Adequate time for benefit",
+}
+
 class TimeToBenefitEngine:
+    __slots__ = (
+        'ttb_df', '_drug_name_lower', '_drug_class_lower', '_match_texts',
+        '_records', '_ttb_min', '_ttb_max'
+    )
+    
+    _LE_MONTHS = {
+        LifeExpectancyCategory.LESS_THAN_1_YEAR: 6,
+        LifeExpectancyCategory.ONE_TO_TWO_YEARS: 18,
+        LifeExpectancyCategory.TWO_TO_FIVE_YEARS: 36,
+        LifeExpectancyCategory.FIVE_TO_TEN_YEARS: 90,
+        LifeExpectancyCategory.MORE_THAN_TEN_YEARS: 120
+    }
+    
     def __init__(self, ttb_df: pd.DataFrame):
         self.ttb_df = ttb_df
-        self.ttb_df['drug_name'] = self.ttb_df['drug_name'].str.lower()
+        # Match against lowercased copies; the caller's frame is left untouched
+        self._drug_name_lower = self.ttb_df['drug_name'].str.lower()
+        self._drug_class_lower = self.ttb_df['drug_class'].str.lower()
+        # Plain lists of the same two columns for literal substring matching
+        self._match_texts = list(zip(self._drug_name_lower.tolist(), self._drug_class_lower.tolist()))
+        # Rows as plain dicts, read by position instead of boxing a Series per row
+        self._records = self.ttb_df.to_dict('records')
+        # Time-to-benefit bounds as arrays, to classify all matched rows at once
+        self._ttb_min = self.ttb_df['ttb_months_min'].to_numpy()
+        self._ttb_max = self.ttb_df['ttb_months_max'].to_numpy()
+        self._ttb_min.flags.writeable = False
+        self._ttb_max.flags.writeable = False
+    
+    @lru_cache(maxsize=1024)
+    def _match_positions(self, drug_lower: str) -> np.ndarray:
+        """
+        Positions of TTB rows whose drug name or class contains the drug
+        (cached; engines are app singletons)
+        """
+        if REGEX_SPECIALS.isdisjoint(drug_lower):
+            positions = np.array([
+                i for i, (name, drug_class) in enumerate(self._match_texts)
+                if (isinstance(name, str) and drug_lower in name)
+                or (isinstance(drug_class, str) and drug_lower in drug_class)
+            ], dtype=np.intp)
+        else:
+            # Patterns with regex syntax keep the pandas regex semantics
+            positions = np.flatnonzero(
+                self._drug_name_lower.str.contains(drug_lower, na=False) |
+                self._drug_class_lower.str.contains(drug_lower, na=False)
+            )
+        positions.flags.writeable = False
+        return positions
     
     def convert_life_expectancy_to_months(self, le_category: LifeExpectancyCategory) -> int:
         """Convert life expectancy category to months"""
-        mapping = {
-            LifeExpectancyCategory.LESS_THAN_1_YEAR: 6,
-            LifeExpectancyCategory.ONE_TO_TWO_YEARS: 18,
-            LifeExpectancyCategory.TWO_TO_FIVE_YEARS: 36,
-            LifeExpectancyCategory.FIVE_TO_TEN_YEARS: 90,
-            LifeExpectancyCategory.MORE_THAN_TEN_YEARS: 120
-        }
-        return mapping.get(le_category, 120)
+        return self._LE_MONTHS.get(le_category, 120)
     
     def assess_time_to_benefit(self, patient: PatientInput) -> List[TimeToBenefit]:
         """Assess if medications will provide benefit within patient's life expectancy"""
+        return list(self._assessments(
+            tuple(med.generic_name for med in patient.medications), patient.life_expectancy
+        ))
+    
+    @lru_cache(maxsize=1024)
+    def _assessments(self, generic_names: tuple,
+                     life_expectancy: LifeExpectancyCategory) -> tuple[TimeToBenefit, ...]:
+        """
+        Assessments per medication name list and life expectancy (cached;
+        engines are app singletons). Assessments are shared between callers.
+        """
         assessments = []
-        patient_le_months = self.convert_life_expectancy_to_months(patient.life_expectancy)
+        patient_le_months = self.convert_life_expectancy_to_months(life_expectancy)
         
-        for med in patient.medications:
-            drug_lower = med.generic_name.lower()
-            
-            # Check if drug is in TTB dataset
-            matches = self.ttb_df[
-                self.ttb_df['drug_name'].str.contains(drug_lower, na=False) |
-                self.ttb_df['drug_class'].str.lower().str.contains(drug_lower, na=False)
-            ]
+        # Check which TTB rows each medication matches: (medication, row position)
+        matched = [
+            (generic_name, i)
+            for generic_name in generic_names
+            for i in self._match_positions(generic_name.lower()).tolist()
+        ]
+        if not matched:
+            return ()
+        
+        # Determine all recommendations in one pass over the matched bounds
+        positions = np.fromiter((i for _, i in matched), dtype=np.intp, count=len(matched))
+        ttb_min = self._ttb_min[positions]
+        kinds = np.select(
+            [
+                ttb_min == 999,  # No benefit (e.g., Aspirin primary prevention)
+                patient_le_months < ttb_min,
+                patient_le_months < self._ttb_max[positions],
+            ],
+            [_REC_NO_BENEFIT, _REC_LE_TOO_SHORT, _REC_MARGINAL],
+            default=_REC_CONTINUE,
+        )
+        
+        for (generic_name, i), kind in zip(matched, kinds.tolist()):
+            row = self._records[i]
+            if kind == _REC_LE_TOO_SHORT:
+                recommendation = f"DEPRESCRIBE - Life expectancy ({life_expectancy.value}) < Time to benefit ({row['time_to_benefit']})"
+            else:
+                recommendation = _REC_TEXT[kind]
             
-            for _, row in matches.iterrows():
-                ttb_min = row['ttb_months_min']
-                ttb_max = row['ttb_months_max']
-                
-                # Determine recommendation
-                if ttb_min == 999:  # No benefit (e.g., Aspirin primary prevention)
-                    recommendation = "DEPRESCRIBE - No proven benefit or harm > benefit"
-                elif patient_le_months < ttb_min:
-                    recommendation = f"DEPRESCRIBE - Life expectancy ({patient.life_expectancy.value}) < Time to benefit ({row['time_to_benefit']})"
-                elif patient_le_months < ttb_max:
-                    recommendation = "CONSIDER DEPRESCRIBING - Marginal benefit window"
-                else:
-                    recommendation = "CONTINUE - Adequate time for benefit"
-                
-                assessments.append(TimeToBenefit(
-                    drug_name=med.generic_name,
-                    indication=row['indication_context'],
-                    time_to_benefit=row['time_to_benefit'],
-                    ttb_months_min=ttb_min,
-                    ttb_months_max=ttb_max,
-                    patient_life_expectancy=patient.life_expectancy.value,
-                    recommendation=recommendation,
-                    deprescribing_guidance=row['deprescribing_guidance'],
-                    reference=row['reference_trial']
-                ))
+            assessments.append(TimeToBenefit(
+                drug_name=generic_name,
+                indication=row['indication_context'],
+                time_to_benefit=row['time_to_benefit'],
+                ttb_months_min=row['ttb_months_min'],
+                ttb_months_max=row['ttb_months_max'],
+                patient_life_expectancy=life_expectancy.value,
+                recommendation=recommendation,
+                deprescribing_guidance=row['deprescribing_guidance'],
+                reference=row['reference_trial']
+            ))
         
-        return assessments
+        return tuple(assessments)
     
     def apply_ttb_modifier(self, base_risk: RiskCategory, patient: PatientInput,
                           drug_name: str) -> tuple[RiskCategory, List[str]]:
@@ -71,24 +137,20 @@ class TimeToBenefitEngine:
         modified_risk = base_risk
         patient_le_months = self.convert_life_expectancy_to_months(patient.life_expectancy)
         
-        drug_lower = drug_name.lower()
-        matches = self.ttb_df[
-            self.ttb_df['drug_name'].str.contains(drug_lower, na=False) |
-            self.ttb_df['drug_class'].str.lower().str.contains(drug_lower, na=False)
-        ]
+        positions = self._match_positions(drug_name.lower())
+        ttb_min = self._ttb_min[positions]
         
-        for _, row in matches.iterrows():
-            ttb_min = row['ttb_months_min']
-            
-            # No benefit drugs (TTB = 999)
-            if ttb_min == 999:
-                modified_risk = RiskCategory.RED
+        # No benefit drugs (TTB = 999), else life expectancy less than minimum
+        # TTB (escalates only a non-RED risk); other matched rows are skipped
+        no_benefit = ttb_min == 999
+        escalates = no_benefit | ((patient_le_months < ttb_min) & (base_risk != RiskCategory.RED))
+        
+        for i, is_no_benefit in zip(positions[escalates].tolist(), no_benefit[escalates].tolist()):
+            row = self._records[i]
+            modified_risk = RiskCategory.RED
+            if is_no_benefit:
                 reasons.append(f"Escalated to RED: No proven benefit for {row['indication_context']}")
-            
-            # Life expectancy less than minimum TTB
-            elif patient_le_months < ttb_min:
-                if base_risk != RiskCategory.RED:
-                    modified_risk = RiskCategory.RED
-                    reasons.append(f"Escalated to RED: Life expectancy insufficient for benefit (need {row['time_to_benefit']})")
+            else:
+                reasons.append(f"Escalated to RED: Life expectancy insufficient for benefit (need {row['time_to_benefit']})")
         
         return modified_risk, reasons
@@ -1,18 +1,33 @@
+import logging
 import pandas as pd
+from functools import lru_cache
 from pathlib import Path
 import json
+
+logger = logging.getLogger(__name__)
+
 # Points to: project_root / datasets
 DATA_DIR = Path(__file__).resolve().parents[3] / "datasets"
 
 
-def _read_csv_safe(path: Path):
-    """Read CSV safely with fallback encodings."""
+@lru_cache(maxsize=None)
+def _parse_csv(path: str) -> pd.DataFrame:
+    """Parse a CSV once per process with fallback encodings."""
     try:
         return pd.read_csv(path, encoding="utf-8")
     except UnicodeDecodeError:
         return pd.read_csv(path, encoding="cp1252")  # Windows encoding fallback
 
 
+def _read_csv_safe(path: Path):
+    """Read CSV safely with fallback encodings.
+    
+    Each call gets its own copy of the cached parse, since engines modify
+    the frames they are given.
+    """
+    return _parse_csv(str(path)).copy()
+
+
 def load_acb_data():
     return _read_csv_safe(DATA_DIR / "acb_brand_list.csv")
 
@@ -48,29 +63,19 @@ def load_ayurvedic_known_interactions():
 
 def load_ayurvedic_pharmacological_profiles():
     file_path = DATA_DIR / "ayurvedic_pharmacological_profiles.json"
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except UnicodeDecodeError:
-        with open(file_path, "r", encoding="utf-8-sig") as f:  # handles BOM issues
-            return json.load(f)
+    # One read; json.loads detects the encoding of bytes, including a UTF-8 BOM
+    return json.loads(file_path.read_bytes())
 
 def load_ayurvedic_herbs_summary():
     return _read_csv_safe(DATA_DIR / "ayurvedic_herbs_summary.csv")
 
-import pandas as pd
-from pathlib import Path
-
-# Add to existing file
 def load_stopp_start_v2():
     """Load STOPP/START v2 criteria from CSV files"""
-    base_path = Path(__file__).resolve().parents[3] / "datasets"
-    
-    stopp_df = _read_csv_safe(base_path / "stopp_criteria_v2.csv")
-    start_df = _read_csv_safe(base_path / "start_criteria_v2.csv")
+    stopp_df = load_stopp_data()
+    start_df = load_start_data()
     
-    print(f"✅ Loaded {len(stopp_df)} STOPP criteria")
-    print(f"✅ Loaded {len(start_df)} START criteria")
+    logger.debug("✅ Loaded %d STOPP criteria", len(stopp_df))
+    logger.debug("✅ Loaded %d START criteria", len(start_df))
     
     return stopp_df, start_df
 
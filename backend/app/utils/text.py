@@ -0,0 +1,4 @@
+# Characters with a meaning in a regex pattern; without any, a regex search is
+# a plain substring search. Newline is included so a pattern can never span
+# two names in a newline-joined search text.
+REGEX_SPECIALS = frozenset('.^$*+?{}[]\\|()\n')
@@ -20,9 +20,11 @@ try:
     
     print("Checking if API server is running...")
     
+    # One keep-alive connection for all probes instead of a new TCP handshake each
+    session = requests.Session()
     try:
         # Try to connect to running server
-        response = requests.get("http://localhost:8000/health", timeout=2)
+        response = session.get("http://localhost:8000/health", timeout=2)
         
         if response.status_code == 200:
             print("✓ API server is running!")
@@ -38,7 +40,7 @@ try:
                 "comorbidities": []
             }
             
-            response = requests.post(
+            response = session.post(
                 "http://localhost:8000/get-taper-plan",
                 json=test_payload,
                 timeout=5
@@ -59,6 +61,8 @@ try:
         print("⚠ API server is NOT running")
         print("  Start it with: uvicorn app.main:app --reload")
         print("  Then run this test again")
+    finally:
+        session.close()
     
     print()
     